@@ -1,20 +1,23 @@
 from __future__ import annotations
-import debugpy
-import time
-from os import listdir
+import asyncio
 import os
-
 import os.path
-from os.path import isfile, join
 import urwid
-from cli.twotabs import *
-from cli.entry import *
-from logic.file import *
-from logic.workspace import *
+from cli.error import ErrorWindow
+from cli.manager import Manager
+from cli.stackedview import StackedView
+from cli.twotabs import TwoTabs
+from logic.workspace import Workspace
+from logic.workspacemanager import WorkspaceManager
+from logic.sizeindex import SizeIndex
+from logic.transactions.trash import Trash
+from logic.transactions.journal import Journal
+from logic.scheduler import JobScheduler
 import sys
 
 sys.path.append(os.path.basename(sys.executable))
 if "-d" in sys.argv:
+    import debugpy
     # Allow other computers to attach to debugpy at this IP address and port.
     debugpy.listen(('0.0.0.0', 5678))
     print("Waiting for debugger to attach...")
@@ -22,8 +25,15 @@ if "-d" in sys.argv:
     # Pause the script until a debugger is attached
     debugpy.wait_for_client()
 
+SizeIndex.load()
+try:
+    recovered = Journal.open()
+except OSError:
+    recovered = []
+JobScheduler.load_history()
 Manager.active_workspaces[0] = Workspace(".")
-Manager.active_workspaces[1] = Workspace(".")
+# Only the first panel is listed before the first frame
+Manager.active_workspaces[1] = Workspace(".", scan=False)
 
 content = TwoTabs({}, Manager.active_workspaces)
 top = content
@@ -48,6 +58,22 @@ loop = urwid.MainLoop(top, palette=[("normal", "default", "default"),
                                     ("rev folds", "dark blue", "light gray")], event_loop=urwid.AsyncioEventLoop())
 never_event = asyncio.Event()
 Manager.loop = loop
+Manager.start_clock()
+if len(recovered) > 0:
+    content.push_on_stack(ErrorWindow("\n".join(recovered)))
+WorkspaceManager.enable_watcher(loop)
+# The workspaces above were built before the event loop was running
+loop.set_alarm_in(0, lambda *args: WorkspaceManager.start_sizing())
+loop.set_alarm_in(
+    0, lambda *args: asyncio.create_task(asyncio.to_thread(Trash.purge)))
+# Alarms set before the loop runs go off ahead of the first draw, so the
+# second panel is loaded from an alarm set by one of them
+loop.set_alarm_in(0, lambda *args: loop.set_alarm_in(
+    0, lambda *args: Manager.active_workspaces[1].load()))
 
 
-loop.run()
+try:
+    loop.run()
+finally:
+    Journal.close()
+    SizeIndex.save()
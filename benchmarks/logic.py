@@ -0,0 +1,240 @@
+# Times the hot paths of the logic layer over synthetic trees that are
+# generated the same way on every run: a flat directory of 100k entries, a
+# tree 20 levels deep, many small files and a few huge sparse files. Run
+# from the repository root:
+#     python -m benchmarks.logic [--scale 0.1] [--save FILE] [--compare FILE]
+# --save writes the results as JSON, --compare reports each result against
+# such a file and exits with 1 when any of them got slower by more than
+# --tolerance and --floor
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from logic.selection import Selection
+from logic.sizeindex import SizeIndex
+from logic.transactions import CopyTransaction, MoveTransaction, RemoveTransaction
+from logic.transactions.transaction import calc_total_size
+from logic.workspace import Workspace, build_table
+from logic.workspacemanager import WorkspaceManager
+
+seed = 0
+# One event loop for every transaction, so that its setup is not timed
+loop = asyncio.new_event_loop()
+
+
+def make_flat(path: str, entries: int) -> None:
+    # One entry in ten is a directory
+    os.mkdir(path)
+    for i in range(entries):
+        name = os.path.join(path, f"e{i:06}")
+        if i % 10 == 0:
+            os.mkdir(name)
+        else:
+            open(name, "w").close()
+
+
+def make_deep(path: str, depth: int, files: int) -> None:
+    # A chain of directories with files and a leaf directory on every level
+    rng = random.Random(seed)
+    for level in range(depth):
+        os.makedirs(os.path.join(path, "leaf"))
+        for i in range(files):
+            with open(os.path.join(path, f"f{i:03}"), "wb") as f:
+                f.write(b"x" * rng.randrange(4096))
+            if i % 5 == 0:
+                open(os.path.join(path, "leaf", f"f{i:03}"), "w").close()
+        path = os.path.join(path, f"d{level:02}")
+    os.mkdir(path)
+
+
+def make_small(path: str, files: int, dirs: int) -> None:
+    rng = random.Random(seed)
+    for i in range(dirs):
+        os.makedirs(os.path.join(path, f"d{i:03}"))
+    for i in range(files):
+        with open(os.path.join(path, f"d{i % dirs:03}", f"f{i:06}"), "wb") as f:
+            f.write(rng.randbytes(rng.randrange(1, 4096)))
+
+
+def make_sparse(path: str, files: int, size: int) -> None:
+    # Some data at the start and the end, a hole in between
+    os.mkdir(path)
+    for i in range(files):
+        with open(os.path.join(path, f"s{i}"), "wb") as f:
+            f.write(b"x" * 4096)
+            f.truncate(size)
+            f.seek(size - 4096)
+            f.write(b"x" * 4096)
+
+
+def make_trees(root: str, scale: float) -> dict[str, str]:
+    trees = {h: os.path.join(root, h) for h in ["flat", "deep", "small", "sparse"]}
+    make_flat(trees["flat"], int(100000 * scale))
+    make_deep(trees["deep"], 20, max(1, int(50 * scale)))
+    make_small(trees["small"], int(20000 * scale), 100)
+    make_sparse(trees["sparse"], 4, max(1 << 20, int((1 << 30) * scale)))
+    return trees
+
+
+def timed(fun, setup=None, repeat: int = 5) -> float:
+    # Best of repeat runs, in seconds; setup runs before each and is not timed
+    best = float("inf")
+    for i in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fun()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def execute(transaction) -> None:
+    res = loop.run_until_complete(transaction.execute())
+    if res is not None:
+        raise RuntimeError(res)
+
+
+def run(scale: float = 1.0, repeat: int = 5) -> dict[str, float]:
+    root = tempfile.mkdtemp(prefix="filemgr-bench-")
+    try:
+        trees = make_trees(root, scale)
+        return measure(root, trees, repeat)
+    finally:
+        # Progress reports of the transactions are still pending
+        tasks = asyncio.all_tasks(loop)
+        for h in tasks:
+            h.cancel()
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        shutil.rmtree(root)
+
+
+def measure(root: str, trees: dict[str, str], repeat: int) -> dict[str, float]:
+    ans = {}
+    ans["build_table flat"] = timed(lambda: build_table(trees["flat"]), repeat=repeat)
+    ans["build_table deep tree"] = timed(
+        lambda: build_table(trees["deep"], True), repeat=repeat)
+
+    flat = Workspace(trees["flat"])
+    ans["rebuild flat"] = timed(flat.rebuild, repeat=repeat)
+    for prop in ["name", "size", "modified"]:
+        ans[f"sort flat by {prop}"] = timed(
+            lambda: flat.set_sort(prop, "desc"), lambda: flat.set_sort("name", "asc"),
+            repeat=repeat)
+
+    # The whole tree is listed, however large the scale
+    max_entries = Workspace.max_entries
+    Workspace.max_entries = 1 << 30
+    try:
+        deep = Workspace(trees["deep"])
+        deep.set_tree(True)
+        ans["rebuild deep tree"] = timed(deep.rebuild, repeat=repeat)
+        dirs = [h for h in deep.get_contents() if h.isDir()]
+        ans["get_children deep tree"] = timed(
+            lambda: [deep.get_children(h) for h in dirs], repeat=repeat)
+    finally:
+        Workspace.max_entries = max_entries
+
+    for name in ["small", "deep", "sparse"]:
+        paths = [os.path.join(trees[name], h) for h in os.listdir(trees[name])]
+        ans[f"calc_total_size {name} cold"] = timed(
+            lambda: calc_total_size(paths), SizeIndex.clear, repeat=repeat)
+        ans[f"calc_total_size {name} warm"] = timed(
+            lambda: calc_total_size(paths), repeat=repeat)
+    # Transactions rebuild every workspace that is not watched, which is
+    # not what is measured below
+    for h in [flat, deep]:
+        WorkspaceManager._instances.remove(h)
+    try:
+        measure_transactions(ans, root, trees, repeat)
+    finally:
+        WorkspaceManager._instances += [flat, deep]
+    return ans
+
+
+def measure_transactions(ans: dict[str, float], root: str,
+                         trees: dict[str, str], repeat: int) -> None:
+    # Every transaction starts from the same state: the copies of the last
+    # run are removed before the next one
+    dst = os.path.join(root, "dst")
+    moved = os.path.join(root, "moved")
+
+    def reset() -> None:
+        for h in [dst, moved]:
+            shutil.rmtree(h, ignore_errors=True)
+        os.mkdir(dst)
+        os.mkdir(moved)
+
+    for name in ["small", "deep", "sparse"]:
+        copied = os.path.join(dst, name)
+        ans[f"copy {name}"] = timed(
+            lambda: execute(CopyTransaction(Selection([trees[name]]), dst)),
+            reset, repeat=repeat)
+
+        def copy() -> None:
+            reset()
+            execute(CopyTransaction(Selection([trees[name]]), dst))
+        ans[f"move {name}"] = timed(
+            lambda: execute(MoveTransaction(Selection([copied]), moved)),
+            copy, repeat=repeat)
+        ans[f"remove {name}"] = timed(
+            lambda: execute(RemoveTransaction(Selection([copied]))),
+            copy, repeat=repeat)
+
+
+def compare(results: dict[str, float], baseline: dict[str, float],
+            tolerance: float, floor: float) -> bool:
+    # Prints every result next to its baseline; False if any regressed.
+    # Differences below floor seconds are noise, whatever the ratio
+    ok = True
+    for name, seconds in results.items():
+        before = baseline.get(name)
+        if before is None or before == 0:
+            print(f"{name:<28} {seconds * 1000:10.2f} ms")
+            continue
+        ratio = seconds / before
+        mark = ""
+        if abs(seconds - before) < floor:
+            pass
+        elif ratio > 1 + tolerance:
+            mark = "  slower"
+            ok = False
+        elif ratio < 1 - tolerance:
+            mark = "  faster"
+        print(f"{name:<28} {seconds * 1000:10.2f} ms {before * 1000:10.2f} ms {ratio:6.2f}x{mark}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="size of the trees relative to the full ones")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="slowdown reported as a regression, 0.2 is 20%%")
+    parser.add_argument("--floor", type=float, default=0.002,
+                        help="smallest difference in seconds that counts")
+    args = parser.parse_args()
+
+    results = run(args.scale, args.repeat)
+    ok = True
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["scale"] != args.scale:
+            print(f"The baseline was taken at scale {baseline['scale']}")
+        ok = compare(results, baseline["results"], args.tolerance, args.floor)
+    else:
+        for name, seconds in results.items():
+            print(f"{name:<28} {seconds * 1000:10.2f} ms")
+    if args.save is not None:
+        with open(args.save, "w") as f:
+            json.dump({"scale": args.scale, "results": results}, f, indent=4)
+    sys.exit(0 if ok else 1)
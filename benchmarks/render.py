@@ -0,0 +1,73 @@
+# Renders a file panel over a synthetic directory and reports time and
+# peak allocated memory per frame, for a still frame, a focus move, a page
+# of scrolling and a panel rebuild. Run from the repository root:
+#     python -m benchmarks.render [files] [frames]
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import urwid
+
+from cli.filepanel import FilePanel
+from logic.workspace import Workspace
+
+size = (100, 50)
+
+
+def make_tree(files: int) -> str:
+    path = tempfile.mkdtemp(prefix="filemgr-render-")
+    for i in range(files):
+        with open(os.path.join(path, f"f{i:06}.txt"), "w") as f:
+            f.write("x" * (i % 100))
+    return path
+
+
+def measure(panel: FilePanel, frames: int, step) -> tuple[float, float]:
+    # Mean seconds and peak bytes allocated per frame. The last canvas is kept
+    # alive, as the screen does, since urwid only caches canvases weakly.
+    canvas = panel.render(size, True)
+    start = time.perf_counter()
+    for i in range(frames):
+        step(i)
+        canvas = panel.render(size, True)
+    elapsed = time.perf_counter() - start
+
+    blocks = 0
+    for i in range(frames):
+        step(i)
+        tracemalloc.start()
+        canvas = panel.render(size, True)
+        blocks += tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed / frames, blocks / frames
+
+
+def run(files: int = 2000, frames: int = 200) -> dict[str, tuple[float, float]]:
+    path = make_tree(files)
+    panel = FilePanel({}, Workspace(path))
+    listbox = panel.original_widget.body
+
+    def still(i):
+        pass
+
+    def focus_move(i):
+        listbox.keypress((size[0], size[1] - 4), "down" if i % 2 == 0 else "up")
+
+    def scroll(i):
+        listbox.keypress((size[0], size[1] - 4), "page down")
+
+    def rebuild(i):
+        panel.rebuild()
+
+    return {"still": measure(panel, frames, still),
+            "focus move": measure(panel, frames, focus_move),
+            "scroll": measure(panel, frames, scroll),
+            "rebuild": measure(panel, frames, rebuild)}
+
+
+if __name__ == "__main__":
+    args = [int(h) for h in sys.argv[1:]]
+    for name, (seconds, blocks) in run(*args).items():
+        print(f"{name:<12} {seconds * 1000:8.3f} ms/frame {blocks / 1024:10.1f} KiB allocated/frame")
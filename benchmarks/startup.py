@@ -0,0 +1,81 @@
+# Launches the app in a pseudo-terminal over a synthetic directory and
+# reports the time from exec to the first frame, and the time to import the
+# UI modules in a fresh interpreter. Run from the repository root:
+#     python -m benchmarks.startup [files] [runs]
+import fcntl
+import os
+import pty
+import select
+import signal
+import statistics
+import subprocess
+import struct
+import sys
+import tempfile
+import termios
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+timeout = 30
+rows, cols = 50, 160
+
+
+def make_tree(files: int) -> str:
+    path = tempfile.mkdtemp(prefix="filemgr-startup-")
+    for i in range(files):
+        with open(os.path.join(path, f"f{i:06}.txt"), "w"):
+            pass
+    return path
+
+
+def environment() -> dict[str, str]:
+    # The journal, size index and trash of a run go to a scratch directory
+    state = tempfile.mkdtemp(prefix="filemgr-state-")
+    env = dict(os.environ, TERM="xterm")
+    for h in ["XDG_STATE_HOME", "XDG_DATA_HOME", "XDG_CACHE_HOME"]:
+        env[h] = state
+    return env
+
+
+def first_frame(path: str, env: dict[str, str]) -> float:
+    # Seconds until the column titles show up on the terminal
+    start = time.perf_counter()
+    pid, fd = pty.fork()
+    if pid == 0:
+        fcntl.ioctl(0, termios.TIOCSWINSZ, struct.pack("HHHH", rows, cols, 0, 0))
+        os.chdir(path)
+        os.execve(sys.executable, [sys.executable, os.path.join(root, "app.py")], env)
+    out = b""
+    try:
+        while b"name" not in out:
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError("No frame was drawn")
+            ready, _, _ = select.select([fd], [], [], 0.1)
+            if ready:
+                out += os.read(fd, 65536)
+        return time.perf_counter() - start
+    finally:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+        os.close(fd)
+
+
+def import_time(env: dict[str, str]) -> float:
+    code = "import time; t = time.perf_counter(); import cli.twotabs; print(time.perf_counter() - t)"
+    return float(subprocess.check_output([sys.executable, "-c", code], cwd=root, env=env))
+
+
+def run(files: int = 10000, runs: int = 10) -> dict[str, tuple[float, float]]:
+    # Median and best seconds of each measurement
+    path = make_tree(files)
+    env = environment()
+    frames = [first_frame(path, env) for i in range(runs)]
+    imports = [import_time(env) for i in range(runs)]
+    return {"first frame": (statistics.median(frames), min(frames)),
+            "imports": (statistics.median(imports), min(imports))}
+
+
+if __name__ == "__main__":
+    args = [int(h) for h in sys.argv[1:]]
+    for name, (median, best) in run(*args).items():
+        print(f"{name:<12} {median * 1000:8.1f} ms median {best * 1000:8.1f} ms best")
@@ -22,6 +22,7 @@ class TableEntry(urwid.Widget):
     def rows(self, size: tuple[int], focus: bool = False) -> int:
         return 1
     _selectable = True
+    _cache_key = None
 
     def __init__(self, data) -> None:
         super().__init__()
@@ -53,15 +54,24 @@ class TableEntry(urwid.Widget):
             method = h["method"]
             method_type = h["type"]
             if (method_type == 'text'):
-                self._column_content[i].set_text(
-                    method(self))
+                value = method(self)
+                if value != self._column_content[i].text:
+                    self._column_content[i].set_text(value)
             elif (method_type == 'widget'):
                 self._column_content[i].update_data()
             i += 1
 
+    def cache_key(self) -> Hashable | None:
+        # Whatever the formatted columns depend on; None reloads them on
+        # every render
+        return None
+
     def render(self, size: tuple[int], focus: bool = False) -> urwid.Canvas:
         (maxcol,) = size
-        self.reload_data()
+        key = self.cache_key()
+        if key is None or key != self._cache_key:
+            self.reload_data()
+            self._cache_key = key
         return self._columns.render(size, focus)
 
 
@@ -78,8 +88,9 @@ class Selectable(urwid.Text):
     _selectable = True
 
     def update_data(self):
-        super().set_text(
-            Selectable.mapping[self._custom_data["FileEntry"].is_selected()])
+        value = Selectable.mapping[self._custom_data["FileEntry"].is_selected()]
+        if value != self.text:
+            super().set_text(value)
 
     def mouse_event(self, size: tuple[()] | tuple[int] | tuple[int, int],
                     event: str, button: int, col: int, row: int, focus: bool) -> bool | None:
@@ -109,10 +120,20 @@ class FileName(urwid.Widget):
         self._custom_data = custom_data.copy()
         self._text = urwid.Text(
             self._custom_data["FileEntry"].data.get_name_formatted(), wrap='ellipsis')
+        self._map = urwid.AttrMap(self._text, self.get_normal())
+
+    def _update_attr(self) -> None:
+        attr = (self.get_focused() if self._custom_data["FileEntry"].focused
+                else self.get_normal())
+        if self._map.attr_map[None] != attr:
+            self._map.set_attr_map({None: attr})
 
     def update_data(self):
-        self._text = urwid.Text(
-            self._custom_data["FileEntry"].data.get_name_formatted(), wrap='ellipsis')
+        # In place, so that unchanged rows keep their cached canvases
+        name = self._custom_data["FileEntry"].data.get_name_formatted()
+        if name != self._text.text:
+            self._text.set_text(name)
+        self._update_attr()
 
     _selectable: False
 
@@ -121,9 +142,8 @@ class FileName(urwid.Widget):
 
     def render(self, size: tuple[int] | tuple[()],
                focus: bool = False) -> urwid.TextCanvas:
-        mp = urwid.AttrMap(self._text, {None: (self.get_focused(
-        ) if self._custom_data["FileEntry"].focused else self.get_normal())})
-        return mp.render(size, focus)
+        self._update_attr()
+        return self._map.render(size, focus)
 
 
 class Title(urwid.AttrMap, DispatchDoubleClick):
@@ -137,8 +157,10 @@ class Title(urwid.AttrMap, DispatchDoubleClick):
         return None
 
     def update(self) -> None:
-        self._text.set_text(self.get_text())
-        self._invalidate()
+        text = self.get_text()
+        if text != self._text.text:
+            self._text.set_text(text)
+            self._invalidate()
 
     def cancel_state(self) -> None:
         self._state = None
@@ -195,6 +217,23 @@ class FileEntry(TableEntry, DispatchDoubleClick):
         self.focused = False
         super().__init__(data)
 
+    def set_data(self, data: File) -> None:
+        data.subscribe(self.rebuild)
+        if data is self.data and self.cache_key() == self._cache_key:
+            # Its own file back, unchanged: the cached canvas still holds
+            return
+        self.data = data
+        self.reload_data()
+        self._cache_key = self.cache_key()
+        self._invalidate()
+
+    def cache_key(self) -> Hashable:
+        # Manager.clock ticks so that the relative modified times move on
+        return (self.data, self.data.get_version(), Manager.clock)
+
+    def release(self) -> None:
+        self.data.unsubscribe(self.rebuild)
+
     def is_selected(self) -> bool | Literal["unavailable"]:
         return self.data.getSelected()
 
@@ -212,7 +251,8 @@ class FileEntry(TableEntry, DispatchDoubleClick):
     schema = [
         {'method': get_file_name,
          'size': 3,
-         'type': 'widget'},
+         'type': 'widget',
+         'focus': True},
         {'method': get_formatted_size,
          'size': 1,
          'type': 'text'},
@@ -244,6 +284,7 @@ class FileEntry(TableEntry, DispatchDoubleClick):
 
     def rebuild(self) -> None:
         self._invalidate()
+        Manager.schedule_redraw()
 
     def mouse_event(self, size: tuple[int], event: str, button: int,
                     col: int, row: int, focus: bool) -> bool | None:
@@ -292,8 +333,10 @@ class FileEntry(TableEntry, DispatchDoubleClick):
             inv = True
         self.focused = focus
         if inv:
-            for h in self._column_content:
-                h._invalidate()
+            # Only the columns drawn differently in the focused row
+            for h, column in zip(self.__class__.schema, self._column_content):
+                if h.get("focus"):
+                    column._invalidate()
         return super().render(size, focus)
 
 
@@ -301,6 +344,7 @@ class TitleEntry(urwid.Pile):
 
     def __init__(self, custom_data):
         self._custom_data = custom_data.copy()
+        self._titles = []
         arr = []
         for i in range(len(FileEntry.schema)):
             if FileEntry.title_schema[i] is None:
@@ -308,12 +352,17 @@ class TitleEntry(urwid.Pile):
                     ('weight', FileEntry.schema[i]["size"], urwid.Text("")))
             else:
                 # pass
-                arr.append(('weight', FileEntry.schema[i]["size"], Title(
-                    self._custom_data, FileEntry.title_schema[i]["name"], FileEntry.title_schema[i]["field"], None)))
+                self._titles.append(Title(
+                    self._custom_data, FileEntry.title_schema[i]["name"], FileEntry.title_schema[i]["field"], None))
+                arr.append(('weight', FileEntry.schema[i]["size"], self._titles[-1]))
 
         super().__init__(
             [urwid.Columns(arr, dividechars=1), urwid.Divider("-")])
 
+    def update(self) -> None:
+        for h in self._titles:
+            h.update()
+
 
 class PanelPathPart(urwid.Text, DispatchDoubleClick):
     def selectable(self) -> bool:
@@ -349,14 +398,29 @@ class PanelPathPart(urwid.Text, DispatchDoubleClick):
 
 class PanelPath(urwid.Pile):
     def __init__(self, custom_data):
+        self._custom_data = custom_data
+        self._state = None
+        self._columns = urwid.Columns([], dividechars=0)
+        super().__init__([self._columns, urwid.Divider("-")])
+        self.update()
+
+    def update(self) -> None:
+        # The parts are only rebuilt when the path or the loading state
+        # changed
+        workspace = self._custom_data["Workspace"]
+        state = (workspace.get_path(), workspace.is_loading())
+        if state == self._state:
+            return
+        self._state = state
 
-        paths = custom_data["Workspace"].get_path().split('/')
+        paths = state[0].split('/')
         objs = [urwid.Text("/")]
         for i in range(2, len(paths) + 1):
             temp = "/" + "/".join(paths[1:i])
             objs.append(urwid.AttrMap(PanelPathPart(
-                custom_data, temp), "normal", "reversed"))
+                self._custom_data, temp), "normal", "reversed"))
             objs.append(urwid.Text("/"))
-
-        super().__init__([urwid.Columns([('pack', h)
-                                         for h in objs], dividechars=0)] + [urwid.Divider("-")])
+        if state[1]:
+            objs.append(urwid.Text("  loading..."))
+        self._columns.contents = [(h, self._columns.options('pack'))
+                                  for h in objs]
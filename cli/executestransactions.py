@@ -1,7 +1,7 @@
 from cli.error import ErrorWindow
 from cli.manager import Manager
-from cli.progress import ProgressWindow
 from cli.stackedview import StackedView
+from logic.scheduler import JobScheduler
 from logic.transactions import Transaction
 
 
@@ -11,19 +11,12 @@ class ExecutesTransactions(StackedView):
 
     async def execute_transaction(
             self, transaction: Transaction, is_cancellation=False) -> None:
-        prog_wnd = None
-        if transaction.__class__.reports_progress():
-            prog_wnd = ProgressWindow()
-            transaction.set_callback(prog_wnd.callback)
-            self.push_on_stack(prog_wnd)
-
-        res = await transaction.execute()
-        if prog_wnd is not None:
-            prog_wnd.pop_on_stack()
+        # The transaction runs as a background job shown in the jobs panel,
+        # so the panels stay usable meanwhile; undo goes ahead of the queue
+        job = JobScheduler.submit(transaction, priority=1 if is_cancellation else 0,
+                                  undoable=not is_cancellation)
+        res = await job.wait()
 
         if res is not None:
             self.push_on_stack(ErrorWindow(res))
             await self._updated_event.wait()
-            return
-        if not is_cancellation:
-            Manager.push_to_queue(transaction.revert())
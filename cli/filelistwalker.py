@@ -0,0 +1,85 @@
+import urwid
+from cli.entry import FileEntry
+from logic.file import File
+from logic.workspace import Workspace
+
+
+class FileListWalker(urwid.ListWalker):
+    # FileEntry widgets are only created for the rows the ListBox asks for.
+    # Once more than that many rows away from the focus they go back to the
+    # pool and get reused for other files. The pool is keyed by the file
+    # last shown, since a widget that gets its own file back keeps its
+    # cached canvas.
+    margin = 128
+
+    def __init__(self, custom_data, workspace: Workspace, pos: int,
+                 pool: dict[File, FileEntry] | None = None) -> None:
+        self._custom_data = custom_data
+        self._workspace = workspace
+        self._pos = pos
+        self._contents = workspace.get_contents()
+        self._focus = 0
+        self._widgets: dict[int, FileEntry] = {}
+        self._pool: dict[File, FileEntry] = {} if pool is None else pool
+
+    def _get(self, position: int) -> tuple[FileEntry, int] | tuple[None, None]:
+        if position < 0 or position >= len(self._contents):
+            return None, None
+        widget = self._widgets.get(position)
+        if widget is None:
+            file = self._contents[position]
+            widget = self._pool.pop(file, None)
+            if widget is None and len(self._pool) > 0:
+                widget = self._pool.popitem()[1]
+            if widget is not None:
+                widget.set_data(file)
+            else:
+                widget = FileEntry(self._custom_data,
+                                   self._contents[position], self._pos, self._workspace)
+            self._widgets[position] = widget
+        return widget, position
+
+    def _recycle(self) -> None:
+        if len(self._widgets) <= 4 * self.margin:
+            return
+        for position in [h for h in self._widgets if abs(
+                h - self._focus) > self.margin]:
+            widget = self._widgets.pop(position)
+            widget.release()
+            self._pool[widget.data] = widget
+
+    def tick(self) -> None:
+        # Rows re-render, and reformat whatever went stale
+        for h in self._widgets.values():
+            h._invalidate()
+
+    def release(self) -> dict[File, FileEntry]:
+        # Returns the widgets, which a walker for the same panel can reuse
+        ans = self._pool
+        for h in self._widgets.values():
+            h.release()
+            ans[h.data] = h
+        self._widgets.clear()
+        self._pool = {}
+        return ans
+
+    def get_focus(self) -> tuple[FileEntry, int] | tuple[None, None]:
+        return self._get(self._focus)
+
+    def set_focus(self, position: int) -> None:
+        self._focus = position
+        self._recycle()
+        self._modified()
+
+    def get_next(self, position: int) -> tuple[FileEntry,
+                                               int] | tuple[None, None]:
+        return self._get(position + 1)
+
+    def get_prev(self, position: int) -> tuple[FileEntry,
+                                               int] | tuple[None, None]:
+        return self._get(position - 1)
+
+    def positions(self, reverse: bool = False) -> range:
+        if reverse:
+            return range(len(self._contents) - 1, -1, -1)
+        return range(len(self._contents))
@@ -1,10 +1,14 @@
 import asyncio
 import urwid
 from cli.error import ErrorWindow
-from logic.transactions import MoveTransaction, RemoveTransaction
-from logic.workspace import *
-from cli.entry import *
+from logic.transactions import MoveTransaction, RemoveTransaction, TrashTransaction
+from cli.entry import PanelPath, TitleEntry
+from cli.manager import Manager
+from logic.workspace import Workspace
+from cli.filelistwalker import FileListWalker
+from cli.patternwindow import PatternWindow
 import typing
+from typing import Literal
 
 
 class FilePanel(urwid.Filler):
@@ -17,10 +21,12 @@ class FilePanel(urwid.Filler):
         self._custom_data["FilePanel"] = self
         self._custom_data["Workspace"] = workspace
         self._infocus = None
-        lbx = urwid.ListBox([FileEntry(
-            self._custom_data, h, self.pos, workspace) for h in workspace.get_contents()])
-        top = urwid.Pile([PanelPath(self._custom_data),
-                         TitleEntry(self._custom_data)],)
+        self._walker = FileListWalker(self._custom_data, workspace, self.pos)
+        lbx = urwid.ListBox(self._walker)
+        # The header lives as long as the panel and is updated in place
+        self._panel_path = PanelPath(self._custom_data)
+        self._titles = TitleEntry(self._custom_data)
+        top = urwid.Pile([self._panel_path, self._titles],)
         cont = urwid.Frame(lbx, header=top)
 
         super().__init__(cont, height=('relative', 80))
@@ -40,22 +46,35 @@ class FilePanel(urwid.Filler):
     def getPath(self) -> str:
         return self._workspace.get_path()
 
-    def rebuild(self, in_focus: bool = False) -> None:
-        lbx = urwid.ListBox([FileEntry(self._custom_data, h, self.pos,
-                            self._workspace) for h in self._workspace.get_contents()])
-
-        top = urwid.Pile([PanelPath(self._custom_data),
-                         TitleEntry(self._custom_data)],)
-        cont = urwid.Frame(lbx, header=top)
+    def rebuild(self, in_focus: bool = False, refresh_rows: bool = False) -> None:
+        error = self._workspace.take_error()
+        if error is not None:
+            self._custom_data["TwoTabs"].push_on_stack(ErrorWindow(error))
+        if refresh_rows:
+            # Only the selection changed: the rows are still the same
+            # files, and those whose version moved on reformat themselves
+            self._walker.tick()
+            Manager.schedule_redraw()
+            return
+        self._walker = FileListWalker(
+            self._custom_data, self._workspace, self.pos, self._walker.release())
+        lbx = urwid.ListBox(self._walker)
+        self._panel_path.update()
+        self._titles.update()
 
         oldpath = self.body.get_focus_path()
-        self.body = cont
+        self.body.body = lbx
 
         if in_focus:
             self.body.set_focus_path(oldpath)
             self.body.set_focus_pending = None
 
         self._invalidate()
+        if self._workspace.is_loading() or in_focus:
+            Manager.schedule_redraw()
+
+    def tick(self) -> None:
+        self._walker.tick()
 
     def _start_selection(self, mode) -> None | str:
         Manager.active_selection = self._workspace.get_selection()
@@ -78,6 +97,13 @@ class FilePanel(urwid.Filler):
         if (key == Manager.KeyMap.delete()
                 and Manager.operation_mode == 'normal'):
             sel = self._workspace.get_selection()
+            asyncio.create_task(
+                self._custom_data["TwoTabs"].execute_transaction(TrashTransaction(sel)))
+            return None
+
+        if (key == Manager.KeyMap.delete_permanently()
+                and Manager.operation_mode == 'normal'):
+            sel = self._workspace.get_selection()
             asyncio.create_task(
                 self._custom_data["TwoTabs"].execute_transaction(RemoveTransaction(sel)))
             return None
@@ -89,6 +115,19 @@ class FilePanel(urwid.Filler):
                 self._custom_data["TwoTabs"].push_on_stack(ErrorWindow(res))
             return None
 
+        if key == Manager.KeyMap.select_all():
+            self._workspace.select_all()
+            return None
+
+        if key == Manager.KeyMap.invert_selection():
+            self._workspace.invert_selection()
+            return None
+
+        if key == Manager.KeyMap.select_pattern():
+            self._custom_data["TwoTabs"].push_on_stack(
+                PatternWindow(self._workspace))
+            return None
+
         if key == Manager.KeyMap.mkdir():
             asyncio.create_task(
                 self._custom_data["TwoTabs"].mkdir(self.getPath()))
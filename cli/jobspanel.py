@@ -0,0 +1,38 @@
+import urwid
+
+from cli.manager import Manager
+from logic.scheduler import Job, JobScheduler
+
+
+class JobsPanel(urwid.WidgetWrap):
+    # Non-modal strip under the file panels with a line per queued or
+    # running job; it takes no space while there are none
+    max_lines = 5
+
+    def __init__(self) -> None:
+        self._pile = urwid.Pile([])
+        super().__init__(self._pile)
+        self.rebuild()
+        JobScheduler.subscribe(self.rebuild)
+
+    @staticmethod
+    def describe(job: Job) -> str:
+        progress = job.get_progress()
+        share = "" if progress is None else f"{int(progress.share() * 100):>3}%"
+        speed = ""
+        if job.state == "running" and progress is not None and progress.total_bytes > 0:
+            import humanize
+            speed = humanize.naturalsize(job.throughput()) + "/s"
+        return f" {job.get_name():<10} {job.state:<8} {share:>4}  {speed}"
+
+    def rows_needed(self) -> int:
+        return len(self._pile.contents)
+
+    def rebuild(self) -> None:
+        jobs = JobScheduler.jobs()
+        lines = [urwid.Divider("-")] if len(jobs) > 0 else []
+        lines += [urwid.Text(JobsPanel.describe(h), wrap="clip")
+                  for h in jobs[:JobsPanel.max_lines]]
+        self._pile.contents = [(h, self._pile.options()) for h in lines]
+        self._invalidate()
+        Manager.schedule_redraw()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 from typing import *
+import asyncio
 
 from logic.transactions import Transaction
 from logic.workspace import Workspace
@@ -8,6 +9,10 @@ import urwid
 
 class Manager:
     _locked_on = None
+    _redraw_pending = False
+    # Coarse clock for the relative times shown in the panels
+    clock = 0
+    clock_period = 15
     loop: urwid.MainLoop
     current_two_tabs = None
     active_workspaces: Iterable[Workspace] = [None, None]
@@ -24,8 +29,6 @@ class Manager:
         if value is not None:
             cls.current_two_tabs.amend_focus(value)
 
-    _queue = []
-
     class KeyMap:
         @staticmethod
         def enter() -> str:
@@ -71,6 +74,18 @@ class Manager:
         def toggle() -> str:
             return " "
 
+        @staticmethod
+        def select_all() -> str:
+            return "ctrl a"
+
+        @staticmethod
+        def invert_selection() -> str:
+            return "*"
+
+        @staticmethod
+        def select_pattern() -> str:
+            return "+"
+
         @staticmethod
         def up() -> str:
             return "backspace"
@@ -79,23 +94,43 @@ class Manager:
         def delete() -> str:
             return "delete"
 
+        @staticmethod
+        def delete_permanently() -> str:
+            return "shift delete"
+
         @staticmethod
         def update() -> str:
             return "f5"
 
-    @classmethod
-    def push_to_queue(cls, transaction: Transaction) -> None:
-        cls._queue.append(transaction)
-
-    @classmethod
-    def pop_from_queue(cls) -> Transaction | None:
-        if len(cls._queue) == 0:
-            return None
-        return cls._queue.pop()
-
     @classmethod
     def global_redraw(cls) -> None:
         # cls.current_two_tabs._invalidate()
 
         cls.loop.screen.clear()
         cls.loop.draw_screen()
+
+    @classmethod
+    def start_clock(cls) -> None:
+        cls.loop.set_alarm_in(cls.clock_period, cls._tick)
+
+    @classmethod
+    def _tick(cls, loop, data) -> None:
+        cls.clock += 1
+        if cls.current_two_tabs is not None:
+            cls.current_two_tabs.tick()
+        cls.start_clock()
+
+    @classmethod
+    def schedule_redraw(cls) -> None:
+        # For changes made outside of input handling (e.g. by background
+        # tasks), which urwid would not draw on its own
+        if cls._redraw_pending:
+            return
+        cls._redraw_pending = True
+        asyncio.get_event_loop().call_soon(cls._redraw)
+
+    @classmethod
+    def _redraw(cls) -> None:
+        cls._redraw_pending = False
+        if hasattr(cls, "loop"):
+            cls.loop.draw_screen()
@@ -0,0 +1,49 @@
+import asyncio
+import urwid
+
+from cli.error import ErrorWindow
+from cli.manager import Manager
+from cli.stackedview import StackedView
+from logic.pattern import FilePattern
+from logic.workspace import Workspace
+
+
+class PatternWindow(urwid.Filler, StackedView):
+    _selectable = True
+
+    def selectable(self) -> bool:
+        return True
+
+    def __init__(self, workspace: Workspace) -> None:
+        self._updated_event = asyncio.Event()
+        self._workspace = workspace
+        self._edit = urwid.Edit(caption="Select: ")
+        hint = urwid.Text(
+            "*.log size>10M age>7d    re:<regex> size<1G age<2h\n\n"
+            "Press Enter to select, esc to cancel", align="center")
+        super().__init__(urwid.Pile([urwid.AttrMap(self._edit, None, "reversed"),
+                                     urwid.Divider("-"), hint]))
+
+    def rebuild(self) -> None:
+        pass
+
+    def keypress(self, size: tuple[int, int] |
+                 tuple[()], key: str) -> str | None:
+        if key == Manager.KeyMap.exit():
+            self.pop_on_stack()
+            return None
+        if key == Manager.KeyMap.enter():
+            self.apply()
+            return None
+        return super().keypress(size, key)
+
+    def apply(self) -> None:
+        try:
+            pattern = FilePattern.parse(self._edit.get_edit_text())
+        except ValueError as e:
+            self.push_on_stack(ErrorWindow(str(e)))
+            return
+        if self._workspace.select_pattern(pattern).empty():
+            self.push_on_stack(ErrorWindow("No files selected"))
+            return
+        self.pop_on_stack()
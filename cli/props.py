@@ -5,7 +5,8 @@ from cli.manager import Manager
 from cli.error import ErrorWindow
 from cli.executestransactions import ExecutesTransactions
 from cli.stackedview import StackedView
-from logic.file import *
+import os
+from logic.file import File
 from logic.transactions import ChangePermissionTransaction, MoveSingleTransaction, MoveTransaction
 
 
@@ -4,10 +4,10 @@ from cli.error import ErrorWindow
 from cli.executestransactions import ExecutesTransactions
 from cli.manager import Manager
 from cli.stackedview import StackedView
-from logic.file import *
-from logic.transactions import CopyTransaction, MakeDirectoryTransaction
-from logic.workspace import *
-from cli.filepanel import *
+from logic.transactions import CopyTransaction, MakeDirectoryTransaction, MoveTransaction
+from cli.filepanel import FilePanel
+from cli.jobspanel import JobsPanel
+from logic.scheduler import JobScheduler
 
 
 class TwoTabs(urwid.WidgetContainerMixin, urwid.Widget, ExecutesTransactions):
@@ -33,11 +33,16 @@ class TwoTabs(urwid.WidgetContainerMixin, urwid.Widget, ExecutesTransactions):
         # right=build_list(build_table("/"))
         res = urwid.Columns([left, right], dividechars=3)
         self.contents = [(res, None)]
+        self._jobs = JobsPanel()
 
     def rebuild(self) -> None:
         for i in [0, 1]:
             self.contents[0][0].contents[i][0].rebuild()
 
+    def tick(self) -> None:
+        for i in [0, 1]:
+            self.contents[0][0].contents[i][0].tick()
+
     def triggerFocusChange(self) -> bool:
         self.contents[0][0].focus_position ^= 1
         return True
@@ -56,18 +61,20 @@ class TwoTabs(urwid.WidgetContainerMixin, urwid.Widget, ExecutesTransactions):
         Manager.set_lock(None)
         Manager.operation_mode = "normal"
 
-    async def paste(self):
+    def paste(self) -> None:
+        # The selection and the target are taken right away and the job runs
+        # in the background, so the panels are free again before it ends
         Transaction = MoveTransaction if Manager.operation_mode == "select_for_move" else CopyTransaction
         transaction = Transaction(
             Manager.active_selection, Manager.active_workspaces[Manager.get_lock()].get_path())
-        await self.execute_transaction(transaction)
         self.set_normal_mode()
+        asyncio.create_task(self.execute_transaction(transaction))
 
     def keypress(self, size: tuple[()] | tuple[int]
                  | tuple[int, int], key: str) -> str | None:
         if key == Manager.KeyMap.undo():
             if Manager.operation_mode == "normal":
-                val = Manager.pop_from_queue()
+                val = JobScheduler.pop_undo()
                 if val is not None:
                     asyncio.create_task(self.execute_transaction(val, True))
 
@@ -79,34 +86,50 @@ class TwoTabs(urwid.WidgetContainerMixin, urwid.Widget, ExecutesTransactions):
         if key == Manager.KeyMap.update():
             if Manager.operation_mode == "normal":
                 for h in Manager.active_workspaces:
-                    h.rebuild()
+                    res = h.rebuild()
+                    if res is not None:
+                        self.push_on_stack(ErrorWindow(res))
                 return None
         if key == Manager.KeyMap.paste():
             if Manager.get_lock() is not None:
-                asyncio.create_task(self.paste())
+                self.paste()
             return None
         if key == Manager.KeyMap.tabchange():
             if Manager.get_lock() is None:
                 self.contents[0][0].focus_position ^= 1
             return None
 
-        return self.contents[0][0].focus.keypress(size, key)
+        return self.contents[0][0].focus.keypress(self._panels_size(size), key)
 
     def mouse_event(self, size: tuple[()] | tuple[int] | tuple[int, int],
                     event: str, button: int, col: int, row: int, focus: bool) -> bool | None:
+        panels_size = self._panels_size(size)
+        if len(size) == 2 and row >= panels_size[1]:
+            return False
         if Manager.operation_mode == "normal":
             return self.contents[0][0].mouse_event(
-                size, event, button, col, row, True)
+                panels_size, event, button, col, row, True)
         else:
             lck = Manager.get_lock()
             return self.contents[0][0].contents[lck][0].mouse_event(
-                size, event, button, col, row, True)
+                panels_size, event, button, col, row, True)
+
+    def _panels_size(self, size: tuple) -> tuple:
+        # The rows left for the file panels above the jobs panel
+        if len(size) != 2:
+            return size
+        maxcol, maxrow = size
+        return (maxcol, max(maxrow - self._jobs.rows_needed(), 1))
 
     def render(self, size: tuple[int, int],
                focus: bool = False) -> urwid.Canvas:
         maxcol, maxrow = size
-
-        return self.contents[0][0].render(size, focus)
+        panels_size = self._panels_size(size)
+        panels = self.contents[0][0].render(panels_size, focus)
+        if panels_size[1] == maxrow:
+            return panels
+        jobs = self._jobs.render((maxcol,), False)
+        return urwid.CanvasCombine([(panels, None, True), (jobs, None, False)])
 
     def _invalidate(self) -> None:
         for h in self.contents:
@@ -5,20 +5,132 @@ import sys
 
 
 class ConfigManager:
+    # apps.json maps regular expressions on the path to commands, where $
+    # stands for the path; the first rule that matches wins. The rules are
+    # compiled into as few alternations as possible on first use and again
+    # whenever the file changes
+    memo_size = 4096
+
+    apps_mapping: dict[str, str] | None = None
+    _file: str | None = None
+    _mtime: int | None = None
+    _commands: list[str] = []
+    # (pattern, rule) for a rule on its own, (pattern, None) for a run of
+    # rules joined with groups named _rule<index>
+    _segments: list[tuple[re.Pattern, int | None]] = []
+    _memo: dict[str, int | None] = {}
+    # Backreferences and conditionals, by number or by name
+    _references = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
 
     @staticmethod
-    def init_app_mapping() -> dict:
-        json_file = None
-        with open(os.path.join(os.path.dirname(sys.executable), "config/apps.json"), "r") as f:
-            json_file = f.read()
-        return json.loads(json_file)
-    apps_mapping: dict[str, str] = init_app_mapping()
+    def config_file() -> str:
+        # Next to the executable in a frozen build, or else next to app.py
+        # when it runs from the source tree
+        paths = [os.path.join(os.path.dirname(sys.executable), "config", "apps.json")]
+        if not getattr(sys, "frozen", False):
+            paths.append(os.path.join(os.path.dirname(os.path.dirname(
+                os.path.abspath(__file__))), "config", "apps.json"))
+        for h in paths:
+            if os.path.exists(h):
+                return h
+        return paths[0]
 
     @classmethod
-    def get_command(cls, path: str) -> str | None:
-        for h in cls.apps_mapping.keys():
-            regex = h
-            if re.match(regex, path):
-                return cls.apps_mapping[h].replace("$", path)
+    def load(cls, file: str | None = None) -> None:
+        cls._file = file or cls.config_file()
+        try:
+            mtime = os.stat(cls._file).st_mtime_ns
+            with open(cls._file, "r") as f:
+                mapping = json.loads(f.read())
+        except (OSError, ValueError):
+            mtime = None
+            mapping = {}
+        cls._compile(mapping)
+        cls._mtime = mtime
+
+    @classmethod
+    def _compile(cls, mapping: dict[str, str]) -> None:
+        # Runs of consecutive rules are joined into one alternation, tried
+        # in order, so the first rule still wins; the group that took part
+        # in the match names the rule. Rules that can't be joined are
+        # matched on their own between the runs
+        cls.apps_mapping = mapping
+        cls._commands = list(mapping.values())
+        cls._memo = {}
+        cls._segments = []
+        rules = list(mapping)
+        run = []
+        for i, h in enumerate(rules):
+            if cls._joinable(h):
+                run.append(i)
+                continue
+            cls._add_run(rules, run)
+            run = []
+            cls._segments.append((re.compile(h), i))
+        cls._add_run(rules, run)
+
+    @classmethod
+    def _joinable(cls, rule: str) -> bool:
+        # Joining renumbers the groups, which breaks references to them by
+        # number or by name, and inline flags are only allowed at the very
+        # start of a pattern
+        if cls._references.search(rule):
+            return False
+        try:
+            re.compile(f"(?:{rule})")
+        except re.error:
+            return False
+        return True
+
+    @classmethod
+    def _add_run(cls, rules: list[str], run: list[int]) -> None:
+        if len(run) == 1:
+            cls._segments.append((re.compile(rules[run[0]]), run[0]))
+            return
+        if len(run) == 0:
+            return
+        try:
+            cls._segments.append((re.compile("|".join(
+                f"(?P<_rule{i}>{rules[i]})" for i in run)), None))
+        except re.error:
+            # Rules that reuse a group name
+            for i in run:
+                cls._segments.append((re.compile(rules[i]), i))
+
+    @classmethod
+    def _refresh(cls) -> None:
+        if cls.apps_mapping is None:
+            cls.load(cls._file)
+            return
+        try:
+            mtime = os.stat(cls._file).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != cls._mtime:
+            cls.load(cls._file)
 
+    @classmethod
+    def _find_rule(cls, path: str) -> int | None:
+        for regex, rule in cls._segments:
+            found = regex.match(path)
+            if found is None:
+                continue
+            if rule is not None:
+                return rule
+            # The group of the rule closes after any group inside it
+            return int(found.lastgroup.removeprefix("_rule"))
         return None
+
+    @classmethod
+    def get_command(cls, path: str) -> str | None:
+        cls._refresh()
+        if path in cls._memo:
+            rule = cls._memo[path]
+        else:
+            rule = cls._find_rule(path)
+            if len(cls._memo) >= cls.memo_size:
+                cls._memo = {}
+            cls._memo[path] = rule
+        if rule is None:
+            return None
+        return cls._commands[rule].replace("$", path)
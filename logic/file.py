@@ -1,39 +1,77 @@
-from typing import Literal
+from typing import Callable, Literal
 import os
 import os.path
+import stat
 
-import humanize.time
 from datetime import datetime
 
 from logic.workspacemanager import WorkspaceManager
 from logic.permissions import FilePermissions
+from logic.sizeindex import SizeIndex
 from logic.subscriptable import Subscriptable
-import humanize
-
-
-def possiblePermissionError(fun):
-    def wrapper(*args, **kwargs):
-        try:
-            return fun(*args, **kwargs)
-        except PermissionError:
-            return "***"
-
-    return wrapper
 
 
 class File(Subscriptable):
     _path: str
     _selected: bool
+    _stat: os.stat_result | None
+    _executable: bool
 
     def __init__(self) -> None:
         super().__init__()
-
-    @possiblePermissionError
-    def getSize(self) -> int | None:
+        self._stat = None
+        self._executable = False
+        self._has_stat = False
+        self._entry = None
+        self._version = 0
+
+    def get_version(self) -> int:
+        # Bumped whenever something shown about the file may have changed,
+        # so that views can tell whether their formatted copy is stale
+        return self._version
+
+    def send_update(self, *args, **kwargs) -> None:
+        self._version += 1
+        super().send_update(*args, **kwargs)
+
+    # All the getters below are served from a single stat snapshot, which is
+    # taken on first use and only retaken by an explicit refresh(). A failed
+    # stat leaves no snapshot, which the getters show as -1 or NaN rather
+    # than raising
+    def refresh(self) -> None:
+        self._take_snapshot(os.stat, self._path)
+
+    def _take_snapshot(self, stat_function: Callable, *args) -> None:
         try:
-            return os.path.getsize(self._path)
-        except BaseException:
+            self._stat = stat_function(*args)
+        except OSError:
+            self._stat = None
+        self._executable = self._stat is not None and FilePermissions.can_execute(
+            self._stat)
+        self._has_stat = True
+        self._entry = None
+        self._version += 1
+
+    def get_stat(self) -> os.stat_result | None:
+        if not self._has_stat:
+            if self._entry is not None:
+                # DirEntry caches its stat, so the first snapshot is free if
+                # someone has already asked the entry for it
+                self._take_snapshot(self._entry.stat)
+            else:
+                self.refresh()
+        return self._stat
+
+    def getSize(self) -> int:
+        st = self.get_stat()
+        if st is None:
             return -1
+        if stat.S_ISDIR(st.st_mode):
+            # Recursive size, once the index knows it
+            size = SizeIndex.lookup(st)
+            if size is not None:
+                return size
+        return st.st_size
 
     def get_pars(self) -> list:
         cur = self._par
@@ -46,35 +84,62 @@ class File(Subscriptable):
     def getSelected(self) -> bool:
         return self._selected
 
-    def setSelected(self, value: bool | Literal["unavailable"]) -> None:
+    def setSelected(self, value: bool | Literal["unavailable"],
+                    notify: bool = True) -> None:
+        # Without notify only the version moves on; bulk changes leave the
+        # notification to the Workspace
         self._selected = value
-        self.send_update()
+        if notify:
+            self.send_update()
+        else:
+            self._version += 1
 
     def get_permissions(self) -> list:
-        return FilePermissions.perms_from_stat(os.stat(self._path))
+        st = self.get_stat()
+        if st is None:
+            return [False] * 9
+        return FilePermissions.perms_from_stat(st)
 
     def getFormattedSize(self) -> str:
-        return "NaN" if self.getSize() == -1 else humanize.naturalsize(self.getSize())
+        # humanize is imported on first use, it is not needed to start up
+        import humanize
+        size = self.getSize()
+        return "NaN" if size == -1 else humanize.naturalsize(size)
 
     def isDir(self) -> bool:
-        return os.path.isdir(self._path)
+        if not self._has_stat and self._entry is not None:
+            # Answered from d_type, without a stat call
+            try:
+                return self._entry.is_dir()
+            except OSError:
+                return False
+        st = self.get_stat()
+        return st is not None and stat.S_ISDIR(st.st_mode)
 
     def is_executable(self) -> bool:
-        return os.access(self._path, os.X_OK)
+        self.get_stat()
+        return self._executable
 
     @staticmethod
     def fromPath(path: str, par=None):
         file = File()
         file._path = path
+        file._name = os.path.basename(path)
         file._selected = False
         file._par = par
         return file
 
+    @staticmethod
+    def from_dir_entry(entry: os.DirEntry, par=None):
+        file = File.fromPath(entry.path, par)
+        file._entry = entry
+        return file
+
     def getPath(self) -> str:
         return self._path
 
     def get_name(self) -> str:
-        return os.path.basename(self._path)
+        return self._name
 
     def get_kth_par(self, k: int):
         if k == 0:
@@ -96,12 +161,13 @@ class File(Subscriptable):
         return os.path.dirname(self._path)
 
     def get_modified(self) -> datetime:
-        try:
-            return datetime.fromtimestamp(int(os.path.getmtime(self._path)))
-        except BaseException:
+        st = self.get_stat()
+        if st is None:
             return datetime.fromtimestamp(0)
+        return datetime.fromtimestamp(int(st.st_mtime))
 
     def get_modified_formatted(self) -> str:
+        import humanize
         ctime = self.get_modified()
         return "NaN" if ctime == datetime.fromtimestamp(
             0) else humanize.naturaltime(ctime)
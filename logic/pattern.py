@@ -0,0 +1,74 @@
+from __future__ import annotations
+import fnmatch
+import re
+import time
+from typing import Iterable
+from logic.file import File
+
+
+class FilePattern:
+    # A glob or a regular expression on the file name, with optional bounds
+    # on the size and on the age of the last modification (in seconds).
+    # Everything is compiled once; matching only reads the cached metadata
+    units = {"": 1, "k": 1 << 10, "m": 1 << 20, "g": 1 << 30, "t": 1 << 40}
+    periods = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+    def __init__(self, pattern: str = "*", regex: bool = False,
+                 min_size: int | None = None, max_size: int | None = None,
+                 min_age: float | None = None, max_age: float | None = None) -> None:
+        self.pattern = pattern
+        self.regex = regex
+        self.min_size = min_size
+        self.max_size = max_size
+        self.min_age = min_age
+        self.max_age = max_age
+        # Globs match the whole name, regular expressions anywhere in it
+        self._match = (re.compile(pattern).search if regex
+                       else re.compile(fnmatch.translate(pattern)).match)
+
+    @classmethod
+    def parse(cls, text: str) -> FilePattern:
+        # "<pattern> [size>10M] [size<1G] [age>7d] [age<2h]"; a pattern
+        # starting with "re:" is a regular expression. Raises ValueError
+        words = text.split()
+        if len(words) == 0:
+            raise ValueError("Empty pattern")
+        pattern = words[0]
+        regex = pattern.startswith("re:")
+        if regex:
+            pattern = pattern[3:]
+        bounds = {}
+        for h in words[1:]:
+            found = re.fullmatch(r"(size|age)([<>])(\d+(?:\.\d+)?)([a-zA-Z]?)", h)
+            if found is None:
+                raise ValueError(f"Unknown filter: {h}")
+            prop, sign, value, unit = found.groups()
+            scale = (cls.units if prop == "size" else cls.periods).get(unit.lower())
+            if scale is None:
+                raise ValueError(f"Unknown unit in {h}")
+            bounds[("min_" if sign == ">" else "max_") + prop] = float(value) * scale
+        try:
+            return cls(pattern, regex, **bounds)
+        except re.error as e:
+            raise ValueError(f"Invalid pattern: {e}")
+
+    def filter(self, files: Iterable[File]) -> list[File]:
+        # The names are checked first, so only the entries that pass get
+        # their stat looked at, and only when there are bounds to check
+        match = self._match
+        ans = [h for h in files if match(h.get_name())]
+        if self.min_size is not None or self.max_size is not None:
+            low = -1 if self.min_size is None else self.min_size
+            high = float("inf") if self.max_size is None else self.max_size
+            ans = [h for h in ans if low < h.getSize() < high]
+        if self.min_age is not None or self.max_age is not None:
+            now = time.time()
+            # Bounds on the age are bounds on the modification time
+            low = -float("inf") if self.max_age is None else now - self.max_age
+            high = float("inf") if self.min_age is None else now - self.min_age
+            ans = [h for h in ans if h.get_stat() is not None
+                   and low < h.get_stat().st_mtime < high]
+        return ans
+
+    def matches(self, file: File) -> bool:
+        return len(self.filter([file])) > 0
@@ -9,6 +9,8 @@ class FilePermissions:
                stat.S_IRGRP, stat.S_IWGRP, stat.S_IXGRP,
                stat.S_IROTH, stat.S_IWOTH, stat.S_IXOTH]
 
+    _groups: set | None = None
+
     @classmethod
     def perms_from_stat(cls, val: os.stat_result) -> list:
         ans = [None] * 9
@@ -16,6 +18,35 @@ class FilePermissions:
             ans[i] = (val.st_mode & cls.mapping[i]) != 0
         return ans
 
+    @classmethod
+    def can_execute(cls, val: os.stat_result) -> bool:
+        # Same answer as os.access(path, os.X_OK), computed from a stat result
+        uid = os.getuid()
+        if uid == 0:
+            return stat.S_ISDIR(val.st_mode) or (val.st_mode & (
+                stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)) != 0
+        if val.st_uid == uid:
+            return (val.st_mode & stat.S_IXUSR) != 0
+        if cls._groups is None:
+            cls._groups = {os.getgid(), *os.getgroups()}
+        if val.st_gid in cls._groups:
+            return (val.st_mode & stat.S_IXGRP) != 0
+        return (val.st_mode & stat.S_IXOTH) != 0
+
+    @classmethod
+    def can_read(cls, val: os.stat_result) -> bool:
+        # Same answer as os.access(path, os.R_OK), computed from a stat result
+        uid = os.getuid()
+        if uid == 0:
+            return True
+        if val.st_uid == uid:
+            return (val.st_mode & stat.S_IRUSR) != 0
+        if cls._groups is None:
+            cls._groups = {os.getgid(), *os.getgroups()}
+        if val.st_gid in cls._groups:
+            return (val.st_mode & stat.S_IRGRP) != 0
+        return (val.st_mode & stat.S_IROTH) != 0
+
     @classmethod
     def int_from_perms(cls, val: list) -> int:
         ans = 0
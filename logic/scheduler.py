@@ -0,0 +1,172 @@
+from __future__ import annotations
+import asyncio
+import heapq
+import time
+from typing import *
+from logic.subscriptable import Subscriptable
+from logic.transactions.journal import Journal
+from logic.transactions.transaction import Progress, Transaction
+
+
+class Job(Subscriptable):
+    # A transaction submitted to the JobScheduler. Subscribers are told
+    # about state changes and progress reports.
+    def __init__(self, transaction: Transaction, priority: int, seq: int,
+                 undoable: bool) -> None:
+        super().__init__()
+        self.transaction = transaction
+        self.priority = priority
+        self.seq = seq
+        self.undoable = undoable
+        self.state: Literal["queued", "running", "done", "failed"] = "queued"
+        self.error = None
+        self.started = None
+        self.finished = None
+        self._result = asyncio.get_event_loop().create_future()
+
+    def get_name(self) -> str:
+        return type(self.transaction).__name__.removesuffix("Transaction")
+
+    def get_progress(self) -> Progress | None:
+        if not hasattr(self.transaction, "get_progress"):
+            return None
+        try:
+            return self.transaction.get_progress()
+        except AttributeError:
+            # Not started yet
+            return None
+
+    def throughput(self) -> float:
+        # Bytes per second since the job started
+        progress = self.get_progress()
+        if progress is None or self.started is None:
+            return 0
+        elapsed = (self.finished or time.monotonic()) - self.started
+        if elapsed <= 0:
+            return 0
+        return progress.bytes_done / elapsed
+
+    async def wait(self) -> None | str:
+        # Result of the transaction: None or an error message
+        return await asyncio.shield(self._result)
+
+
+class JobScheduler:
+    # Runs transactions as concurrent jobs. Those that report progress move
+    # data and are capped at max_running, started by priority and then in
+    # submission order; the rest only touch metadata and start right away.
+    # Undo entries are published in submission order, whatever order the
+    # jobs finish in; the journal gets them in the order they finish.
+    max_running = 2
+
+    _seq = 0
+    _queue: list[tuple[int, int, Job]] = []
+    _running: set[Job] = set()
+    _jobs: list[Job] = []
+    _finished: dict[int, int | Transaction | None] = {}
+    _frontier = 0
+    # Journal ids of undo entries, or the transactions themselves when the
+    # journal is not open
+    _undo: list[int | Transaction] = []
+    _subscribed: list[Callable] = []
+
+    @classmethod
+    def subscribe(cls, value: Callable) -> None:
+        cls._subscribed.append(value)
+
+    @classmethod
+    def unsubscribe(cls, value: Callable) -> None:
+        cls._subscribed.remove(value)
+
+    @classmethod
+    def send_update(cls) -> None:
+        for h in cls._subscribed:
+            h()
+
+    @classmethod
+    def submit(cls, transaction: Transaction, priority: int = 0,
+               undoable: bool = True) -> Job:
+        job = Job(transaction, priority, cls._seq, undoable)
+        cls._seq += 1
+        cls._jobs.append(job)
+        if transaction.__class__.reports_progress():
+            transaction.set_callback(lambda value: cls._report(job))
+            heapq.heappush(cls._queue, (-priority, job.seq, job))
+            cls._pump()
+        else:
+            cls._start(job)
+        cls.send_update()
+        return job
+
+    @classmethod
+    def jobs(cls) -> list[Job]:
+        # Jobs that are queued or running, in submission order
+        return list(cls._jobs)
+
+    @classmethod
+    def load_history(cls) -> None:
+        # Undo entries of the previous sessions, from the journal
+        cls._undo = Journal.history()
+
+    @classmethod
+    def pop_undo(cls) -> Transaction | None:
+        if len(cls._undo) == 0:
+            return None
+        ans = cls._undo.pop()
+        if isinstance(ans, int):
+            return Journal.take_undo(ans)
+        return ans
+
+    @classmethod
+    def _commit(cls, job: Job) -> int | Transaction | None:
+        # The commit goes to the journal as soon as the job is done, so that
+        # a crash never takes a finished job for an interrupted one
+        revert = job.transaction.revert() if job.undoable else None
+        id = job.transaction._journal_id
+        if id is not None and Journal.commit(id, revert):
+            return id
+        return revert
+
+    @classmethod
+    def _report(cls, job: Job) -> None:
+        job.send_update()
+        cls.send_update()
+
+    @classmethod
+    def _pump(cls) -> None:
+        while len(cls._running) < cls.max_running and len(cls._queue) > 0:
+            cls._start(heapq.heappop(cls._queue)[2])
+
+    @classmethod
+    def _start(cls, job: Job) -> None:
+        job.state = "running"
+        job.started = time.monotonic()
+        if job.transaction.__class__.reports_progress():
+            cls._running.add(job)
+        asyncio.create_task(cls._run(job))
+
+    @classmethod
+    async def _run(cls, job: Job) -> None:
+        try:
+            res = await job.transaction.execute()
+        except Exception as e:
+            res = f"Unexpected error: {e}"
+        job.finished = time.monotonic()
+        job.error = res
+        job.state = "done" if res is None else "failed"
+        cls._running.discard(job)
+        cls._jobs.remove(job)
+
+        if res is not None and job.transaction._journal_id is not None:
+            Journal.abort(job.transaction._journal_id)
+        cls._finished[job.seq] = cls._commit(job) if res is None else None
+        while cls._frontier in cls._finished:
+            h = cls._finished.pop(cls._frontier)
+            if h is not None:
+                cls._undo.append(h)
+            cls._frontier += 1
+
+        job._result.set_result(res)
+        job.send_update()
+        cls._pump()
+        cls.send_update()
@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+
+
+class SizeIndex:
+    # Recursive sizes of directories, keyed by (device, inode) and valid
+    # while the directory's mtime stays the same. Like du -x, a size stays
+    # on the filesystem of its directory: mount points below it count as
+    # empty. Changes deeper down do not touch the mtime of the ancestors,
+    # so whoever makes or sees them has to call invalidate, which drops the
+    # whole chain up to the root. A file growing in a nested directory, or
+    # any change made by another program, is therefore not noticed and the
+    # size stays stale until the directory itself changes.
+    # Every load starts a new session; save keeps only the entries used in
+    # the last max_sessions sessions, and at most max_entries of them.
+    max_sessions = 10
+    max_entries = 100000
+
+    _entries: dict[tuple[int, int], tuple[int, int]] = {}
+    _seen: dict[tuple[int, int], int] = {}
+    _session = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def default_file() -> str:
+        cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".cache")
+        return os.path.join(cache, "filemgr", "dirsizes.json")
+
+    @classmethod
+    def lookup(cls, st: os.stat_result | None) -> int | None:
+        if st is None:
+            return None
+        key = (st.st_dev, st.st_ino)
+        cached = cls._entries.get(key)
+        if cached is None or cached[0] != st.st_mtime_ns:
+            return None
+        cls._seen[key] = cls._session
+        return cached[1]
+
+    @classmethod
+    def calc(cls, path: str) -> int:
+        return cls._calc(path, os.stat(path))
+
+    @classmethod
+    def _calc(cls, path: str, st: os.stat_result) -> int:
+        ans = cls.lookup(st)
+        if ans is not None:
+            return ans
+        ans = 0
+        try:
+            with os.scandir(path) as it:
+                for h in it:
+                    if h.is_symlink():
+                        continue
+                    if h.is_dir():
+                        child = h.stat(follow_symlinks=False)
+                        if child.st_dev == st.st_dev:
+                            ans += cls._calc(h.path, child)
+                    elif h.is_file():
+                        ans += h.stat(follow_symlinks=False).st_size
+        except OSError:
+            # Unreadable parts count as empty and are not remembered
+            return ans
+        key = (st.st_dev, st.st_ino)
+        cls._entries[key] = (st.st_mtime_ns, ans)
+        cls._seen[key] = cls._session
+        return ans
+
+    @classmethod
+    def invalidate(cls, path: str) -> None:
+        path = os.path.abspath(path)
+        while True:
+            try:
+                st = os.stat(path)
+                cls._entries.pop((st.st_dev, st.st_ino), None)
+            except OSError:
+                pass
+            parent = os.path.dirname(path)
+            if parent == path:
+                return
+            path = parent
+
+    @classmethod
+    def clear(cls) -> None:
+        cls._entries.clear()
+        cls._seen.clear()
+
+    @classmethod
+    def load(cls, file: str | None = None) -> None:
+        try:
+            with open(file or cls.default_file(), "r") as f:
+                data = json.load(f)
+            session = data["session"] + 1
+            entries = data["entries"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        cls._session = session
+        for key, value in entries.items():
+            dev, ino = key.split(":")
+            key = (int(dev), int(ino))
+            cls._entries[key] = (value[0], value[1])
+            cls._seen[key] = value[2]
+
+    @classmethod
+    def save(cls, file: str | None = None) -> None:
+        file = file or cls.default_file()
+        oldest = cls._session - cls.max_sessions + 1
+        with cls._lock:
+            kept = [(cls._seen.get(h, cls._session), h, v)
+                    for h, v in list(cls._entries.items())]
+        kept = [h for h in kept if h[0] >= oldest]
+        if len(kept) > cls.max_entries:
+            kept.sort(key=lambda h: h[0])
+            kept = kept[len(kept) - cls.max_entries:]
+        data = {"session": cls._session,
+                "entries": {f"{h[0]}:{h[1]}": [*v, seen] for seen, h, v in kept}}
+        try:
+            os.makedirs(os.path.dirname(file), exist_ok=True)
+            with open(file + ".tmp", "w") as f:
+                json.dump(data, f)
+            os.replace(file + ".tmp", file)
+        except OSError:
+            pass
@@ -4,3 +4,4 @@ from logic.transactions.makedirectorytransaction import MakeDirectoryTransaction
 from logic.transactions.movetransaction import MoveSingleTransaction, MoveTransaction
 from logic.transactions.removetransaction import RemoveTransaction
 from logic.transactions.transaction import Transaction
+from logic.transactions.trashtransaction import RestoreTransaction, TrashTransaction
@@ -22,8 +22,17 @@ class ChangePermissionTransaction(Transaction):
 
     async def execute(self, progress_callback: None |
                       Callable = None) -> None | str:
+        self._begin()
         try:
             os.chmod(self._path, FilePermissions.int_from_perms(
                 self._new_permissions))
         except PermissionError:
             return "Operation not permitted"
+
+    def to_record(self) -> dict:
+        return {"type": "ChangePermissionTransaction", "path": self._path,
+                "old": self._old_permissions, "new": self._new_permissions}
+
+    @staticmethod
+    def _from_record(record: dict) -> ChangePermissionTransaction:
+        return ChangePermissionTransaction(record["path"], record["old"], record["new"])
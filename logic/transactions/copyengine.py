@@ -0,0 +1,133 @@
+from __future__ import annotations
+import errno
+import fcntl
+import os
+from collections import Counter
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from logic.transactions.transaction import Progress
+from logic.transactions.manifest import Manifest
+
+# Errors meaning that a copy strategy is not supported for this pair of
+# files, in which case the next one is tried
+_unsupported = {errno.ENOSYS, errno.EXDEV, errno.EINVAL,
+                errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF, errno.ETXTBSY}
+
+kernel_chunk = 8 * 1024 * 1024
+buffer_size = 1024 * 1024
+
+# ioctl that makes dest share the extents of source, on filesystems with
+# copy-on-write (btrfs, XFS); ENOTTY is what the others answer
+FICLONE = 0x40049409
+_no_clone = _unsupported | {errno.ENOTTY, errno.EPERM}
+
+
+def _clone(src_fd: int, dst_fd: int, progress: Progress) -> bool:
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+    except OSError as e:
+        if e.errno in _no_clone:
+            return False
+        raise
+    progress.add(bytes=os.fstat(src_fd).st_size)
+    return True
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, progress: Progress) -> bool:
+    if not hasattr(os, "copy_file_range"):
+        return False
+    first = True
+    while True:
+        try:
+            copied = os.copy_file_range(src_fd, dst_fd, kernel_chunk)
+        except OSError as e:
+            if first and e.errno in _unsupported:
+                return False
+            raise
+        if copied == 0:
+            return True
+        first = False
+        progress.add(bytes=copied)
+
+
+def _sendfile(src_fd: int, dst_fd: int, progress: Progress) -> bool:
+    first = True
+    while True:
+        try:
+            copied = os.sendfile(dst_fd, src_fd, None, kernel_chunk)
+        except OSError as e:
+            if first and e.errno in _unsupported:
+                return False
+            raise
+        if copied == 0:
+            return True
+        first = False
+        progress.add(bytes=copied)
+
+
+def _buffered(src_fd: int, dst_fd: int, progress: Progress) -> bool:
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    while True:
+        size = os.readv(src_fd, [buffer])
+        if size == 0:
+            return True
+        written = 0
+        while written < size:
+            written += os.write(dst_fd, view[written:size])
+        progress.add(bytes=size)
+
+
+strategies = [_clone, _copy_file_range, _sendfile, _buffered]
+
+
+def strategy_name(strategy) -> str:
+    return strategy.__name__.lstrip("_")
+
+
+def copy_file(source: str, dest: str, progress: Progress) -> str:
+    # Returns the name of the strategy that copied the data
+    src_fd = os.open(source, os.O_RDONLY)
+    try:
+        dst_fd = os.open(dest, os.O_WRONLY | os.O_CREAT |
+                         os.O_TRUNC, 0o600)
+        try:
+            for h in strategies:
+                if h(src_fd, dst_fd, progress):
+                    break
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    shutil.copystat(source, dest)
+    progress.add(files=1)
+    return strategy_name(h)
+
+
+def _copy_files(files: list, progress: Progress, workers: int) -> Counter:
+    if workers <= 1 or len(files) <= 1:
+        return Counter(copy_file(source, dest, progress) for source, dest in files)
+    with ThreadPoolExecutor(workers) as pool:
+        futures = [pool.submit(copy_file, source, dest, progress)
+                   for source, dest in files]
+    # Every file gets its chance before the first error is reported
+    for h in futures:
+        if h.exception() is not None:
+            raise h.exception()
+    return Counter(h.result() for h in futures)
+
+
+def copy_all(manifest: Manifest, progress: Progress, workers: int = 1) -> Counter:
+    # The whole directory skeleton is created first, then the files are
+    # copied, concurrently when workers > 1. Returns how many files each
+    # strategy copied.
+    for src_dir, dst_dir, st in manifest.dirs:
+        os.mkdir(dst_dir)
+    for target, dest in manifest.links:
+        os.symlink(target, dest)
+        progress.add(files=1)
+    used = _copy_files([h[:2] for h in manifest.files], progress, workers)
+    # Parents last, as creating the children changes their mtime
+    for src_dir, dst_dir, st in reversed(manifest.dirs):
+        shutil.copystat(src_dir, dst_dir)
+    return used
@@ -8,6 +8,9 @@ from logic.selection import Selection
 from logic.workspacemanager import WorkspaceManager
 from logic.transactions.transaction import *
 from logic.transactions.removetransaction import *
+from logic.transactions.copyengine import copy_all
+from logic.transactions.manifest import Manifest
+from logic.transactions.removeengine import remove
 
 
 class CopyTransaction(Transaction):
@@ -16,11 +19,18 @@ class CopyTransaction(Transaction):
     def reports_progress() -> bool:
         return True
 
-    def __init__(self, files: Selection, new_path: str) -> None:
+    # Files are copied by a pool of that many threads, which pays off
+    # for many small files; 1 copies them one by one
+    default_workers = 4
+
+    def __init__(self, files: Selection, new_path: str,
+                 workers: int | None = None) -> None:
         def prep(val: str) -> tuple[str, str]:
             return (val, os.path.join(new_path, os.path.basename(val)))
         self._progress_callback = None
         self._instructions = [prep(h) for h in files.get_list()]
+        self._workers = CopyTransaction.default_workers if workers is None else workers
+        self._strategies = {}
 
     def set_callback(self, callback: Callable) -> None:
         self._progress_callback = callback
@@ -29,6 +39,9 @@ class CopyTransaction(Transaction):
     def _from_instructions(instructions: list) -> CopyTransaction:
         ans = CopyTransaction.__new__(CopyTransaction)
         ans._instructions = instructions
+        ans._progress_callback = None
+        ans._workers = CopyTransaction.default_workers
+        ans._strategies = {}
         return ans
 
     async def execute(self) -> None | str:
@@ -40,40 +53,79 @@ class CopyTransaction(Transaction):
             if not os.access(source, os.R_OK):
                 return f"Cannot read file {source}"
 
-            if os.path.isdir(source):
-                walkres = None
-                try:
-                    walkres = os.walk(source)
-                except BaseException:
-                    return f"Permission error while traversing directory {source}"
-                for curdir, subdirs, subfiles in walkres:
-                    for hhh in subdirs + subfiles:
-                        if not os.access(os.path.join(curdir, hhh), os.R_OK):
-                            return f"Cannot read file {hhh} from {source}"
+        # One walk of the sources serves the checks, the totals and the copy;
+        # it is kept per instruction so that each can be journaled as done
+        def build() -> list[Manifest]:
+            return [Manifest.build([h]) for h in self._instructions]
+        try:
+            parts = await asyncio.to_thread(build)
+            manifest = Manifest.merge(parts)
+        except OSError as e:
+            return f"Error while reading {e.filename}: {e.strerror}"
+        if len(manifest.unreadable) > 0:
+            return f"Cannot read file {manifest.unreadable[0]}"
 
-        total_size = calc_total_size([source for h in self._instructions])
+        self._progress = Progress(manifest.total_bytes, manifest.total_files())
+        self._begin()
 
         def real_op():
-            i = 0
-            for h in self._instructions:
-                if os.path.isdir(source):
-                    shutil.copytree(source, dest)
-                else:
-                    shutil.copy(source, dest)
+            # Single files go to the pool together, every directory after
+            # them on its own
+            files = [i for i, h in enumerate(parts) if len(h.dirs) == 0]
+            used = copy_all(Manifest.merge([parts[i] for i in files]),
+                            self._progress, self._workers)
+            self._step(*files)
+            for i, h in enumerate(parts):
+                if len(h.dirs) > 0:
+                    used += copy_all(h, self._progress, self._workers)
+                    self._step(i)
+            self._strategies = used
 
         async def reports(cancellation: asyncio.Event) -> None:
             while not cancellation.is_set():
-                cur_size = calc_total_size([h[1] for h in self._instructions])
-                share = cur_size / total_size if total_size != 0 else 1
                 if self._progress_callback is not None:
-                    self._progress_callback(share)
+                    self._progress_callback(self._progress.share())
                 await asyncio.sleep(0.2)
 
         cancel_reports = asyncio.Event()
         asyncio.create_task(reports(cancel_reports))
-        await asyncio.to_thread(real_op)
-        cancel_reports.set()
-        WorkspaceManager.rebuild_all()
+        try:
+            await asyncio.to_thread(real_op)
+        except OSError as e:
+            return f"Error while copying {e.filename}: {e.strerror}"
+        finally:
+            cancel_reports.set()
+            self._changed([os.path.dirname(h[1]) for h in self._instructions])
+
+    def get_progress(self) -> Progress:
+        return self._progress
+
+    def get_strategies(self) -> dict[str, int]:
+        # How many files each copy strategy handled, e.g. {"clone": 12}
+        return dict(self._strategies)
+
+    def to_record(self) -> dict:
+        return {"type": "CopyTransaction", "instructions": self._instructions}
+
+    @staticmethod
+    def _from_record(record: dict) -> CopyTransaction:
+        return CopyTransaction._from_instructions(
+            [tuple(h) for h in record["instructions"]])
+
+    def recover(self) -> RemoveTransaction | None:
+        # The destinations did not exist before, so whatever is there is
+        # an unfinished copy, unless it was journaled as complete
+        done = []
+        for i, (source, dest) in enumerate(self._instructions):
+            if not os.path.lexists(dest):
+                continue
+            if i in self._journal_steps:
+                done.append(dest)
+            else:
+                remove(dest)
+        if len(done) == 0:
+            return None
+        return RemoveTransaction(Selection(done))
 
     def revert(self) -> CopyTransaction:
         return RemoveTransaction(Selection([h[1] for h in self._instructions]))
@@ -0,0 +1,232 @@
+from __future__ import annotations
+import fcntl
+import json
+import os
+import threading
+from typing import *
+
+
+class Journal:
+    # Append-only log of transactions, one JSON object per line:
+    #   {"op": "intent", "id": n, "tx": {...}}   before the first change on disk
+    #   {"op": "commit", "id": n, "undo": {...} | null}
+    #   {"op": "abort", "id": n}
+    #   {"op": "undone", "id": n}                 the undo of n was taken
+    #   {"op": "step", "id": n, "steps": [i]}     parts i of n are past the
+    #                                             point of no return
+    # Intents and steps are fsync'd right away, the rest in batches. An
+    # intent without a commit or abort found on open belongs to an
+    # interrupted transaction, which gets its recover() called with the
+    # steps it recorded in _journal_steps. Committed undo entries are the undo
+    # history across sessions; only their offsets are kept in memory.
+    # One process at a time owns the journal, by an flock on a file next to
+    # it: another instance would take live transactions for crashed ones
+    batch = 32
+    max_history = 100
+
+    _file = None
+    _path: str | None = None
+    _next_id = 0
+    _pending = 0
+    _offsets: dict[int, int] = {}
+    _owner = None
+    # Steps are written from worker threads
+    _lock = threading.Lock()
+
+    @staticmethod
+    def default_file() -> str:
+        state = os.environ.get("XDG_STATE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".local", "state")
+        return os.path.join(state, "filemgr", "journal.jsonl")
+
+    @staticmethod
+    def _types() -> dict[str, type]:
+        from logic.transactions import (ChangePermissionTransaction, CopyTransaction,
+                                        MakeDirectoryTransaction, MoveTransaction,
+                                        RemoveTransaction, RestoreTransaction,
+                                        TrashTransaction)
+        from logic.transactions.transaction import DoNothingTransaction
+        return {h.__name__: h for h in [
+            ChangePermissionTransaction, CopyTransaction, DoNothingTransaction,
+            MakeDirectoryTransaction, MoveTransaction, RemoveTransaction,
+            RestoreTransaction, TrashTransaction]}
+
+    @classmethod
+    def decode(cls, record: dict):
+        return cls._types()[record["type"]]._from_record(record)
+
+    @classmethod
+    def is_open(cls) -> bool:
+        return cls._file is not None
+
+    @classmethod
+    def open(cls, file: str | None = None) -> list[str]:
+        # Recovers interrupted transactions and compacts the file down to
+        # the undo history; returns a message per recovered transaction.
+        # Without the lock the session runs with no journal at all
+        path = file or cls.default_file()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not cls._lock_owner(path):
+            cls._offsets = {}
+            return ["Another instance is running: this one keeps no undo history "
+                    "and can't recover from a crash"]
+        intents = {}
+        steps: dict[int, set[int]] = {}
+        history = {}
+        next_id = 0
+        try:
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn last line from a crash
+                        continue
+                    id = record["id"]
+                    next_id = max(next_id, id + 1)
+                    if record["op"] == "intent":
+                        intents[id] = record["tx"]
+                    elif record["op"] in ("commit", "abort"):
+                        intents.pop(id, None)
+                        if record.get("undo") is not None:
+                            history[id] = record["undo"]
+                    elif record["op"] == "undone":
+                        history.pop(id, None)
+                    elif record["op"] == "step":
+                        steps.setdefault(id, set()).update(record["steps"])
+        except FileNotFoundError:
+            pass
+
+        messages = []
+        for id, tx in intents.items():
+            try:
+                transaction = cls.decode(tx)
+                transaction._journal_steps = steps.get(id, set())
+                undo = transaction.recover()
+            except (OSError, KeyError) as e:
+                messages.append(f"Could not recover {tx.get('type')}: {e}")
+                continue
+            messages.append(f"Recovered an interrupted {tx['type']}")
+            if undo is not None:
+                history[id] = undo.to_record()
+
+        # Only the newest entries survive, in the order they were committed
+        kept = list(history.items())[-cls.max_history:]
+        cls._offsets = {}
+        with open(path + ".tmp", "wb") as f:
+            for id, undo in kept:
+                cls._offsets[id] = f.tell()
+                f.write(cls._encode({"op": "commit", "id": id, "undo": undo}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+        cls._path = path
+        cls._next_id = next_id
+        cls._pending = 0
+        cls._file = open(path, "ab")
+        return messages
+
+    @classmethod
+    def _lock_owner(cls, path: str) -> bool:
+        # The lock goes away with the process that holds it, crashed or not
+        if cls._owner is not None:
+            if cls._owner.name == path + ".lock":
+                return True
+            cls._unlock()
+        owner = open(path + ".lock", "ab")
+        try:
+            fcntl.flock(owner.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            owner.close()
+            return False
+        cls._owner = owner
+        return True
+
+    @classmethod
+    def _unlock(cls) -> None:
+        if cls._owner is not None:
+            cls._owner.close()
+            cls._owner = None
+
+    @classmethod
+    def close(cls) -> None:
+        if cls._file is not None:
+            cls.sync()
+            cls._file.close()
+            cls._file = None
+        cls._unlock()
+
+    @staticmethod
+    def _encode(record: dict) -> bytes:
+        return (json.dumps(record, separators=(",", ":")) + "\n").encode()
+
+    @classmethod
+    def _write(cls, record: dict, sync: bool = False) -> int:
+        with cls._lock:
+            offset = cls._file.tell()
+            cls._file.write(cls._encode(record))
+            cls._file.flush()
+            cls._pending += 1
+            if sync or cls._pending >= cls.batch:
+                cls._sync()
+            return offset
+
+    @classmethod
+    def sync(cls) -> None:
+        with cls._lock:
+            cls._sync()
+
+    @classmethod
+    def _sync(cls) -> None:
+        if cls._file is None or cls._pending == 0:
+            return
+        os.fsync(cls._file.fileno())
+        cls._pending = 0
+
+    @classmethod
+    def begin(cls, transaction) -> int | None:
+        if cls._file is None:
+            return None
+        id = cls._next_id
+        cls._next_id += 1
+        cls._write({"op": "intent", "id": id, "tx": transaction.to_record()}, True)
+        return id
+
+    @classmethod
+    def commit(cls, id: int, undo) -> bool:
+        # True when the undo entry went to the journal and can be taken back
+        # with take_undo(id)
+        if cls._file is None:
+            return False
+        record = None if undo is None else undo.to_record()
+        offset = cls._write({"op": "commit", "id": id, "undo": record})
+        if record is None:
+            return False
+        cls._offsets[id] = offset
+        return True
+
+    @classmethod
+    def step(cls, id: int, steps: list[int]) -> None:
+        if cls._file is not None:
+            cls._write({"op": "step", "id": id, "steps": steps}, True)
+
+    @classmethod
+    def abort(cls, id: int) -> None:
+        if cls._file is not None:
+            cls._write({"op": "abort", "id": id})
+
+    @classmethod
+    def history(cls) -> list[int]:
+        return list(cls._offsets)
+
+    @classmethod
+    def take_undo(cls, id: int):
+        offset = cls._offsets.pop(id, None)
+        if offset is None or cls._file is None:
+            return None
+        with open(cls._path, "rb") as f:
+            f.seek(offset)
+            record = json.loads(f.readline())
+        cls._write({"op": "undone", "id": id})
+        return cls.decode(record["undo"])
@@ -29,11 +29,25 @@ class MakeDirectoryTransaction(Transaction):
             return f"Can't write to {self._path}"
         for h in self.get_name():
             if not os.path.exists(os.path.join(self._path, h)):
-                os.mkdir(os.path.join(self._path, h))
-                WorkspaceManager.rebuild_all()
                 self._new_path = os.path.join(self._path, h)
+                self._begin()
+                os.mkdir(self._new_path)
+                self._changed([self._path])
                 return
 
+    def to_record(self) -> dict:
+        return {"type": "MakeDirectoryTransaction", "path": self._path,
+                "new_path": self._new_path}
+
+    @staticmethod
+    def _from_record(record: dict) -> MakeDirectoryTransaction:
+        ans = MakeDirectoryTransaction(record["path"])
+        ans._new_path = record["new_path"]
+        return ans
+
+    def recover(self) -> RemoveTransaction | None:
+        return self.revert() if os.path.isdir(self._new_path) else None
+
     def revert(self) -> str:
 
         return RemoveTransaction(Selection([self._new_path]))
@@ -0,0 +1,74 @@
+from __future__ import annotations
+import os
+import stat
+from logic.permissions import FilePermissions
+
+
+class Manifest:
+    # Everything a copy needs to know about its sources, gathered by a
+    # single scandir walk. The preflight, the progress totals and the copy
+    # itself all read it instead of going back to the disk.
+    def __init__(self) -> None:
+        # (source, dest, stat) in walk order, so parents come first
+        self.dirs: list[tuple[str, str, os.stat_result]] = []
+        self.files: list[tuple[str, str, os.stat_result]] = []
+        # (link target, dest)
+        self.links: list[tuple[str, str]] = []
+        self.unreadable: list[str] = []
+        self.total_bytes = 0
+
+    def total_files(self) -> int:
+        return len(self.files) + len(self.links)
+
+    def _add(self, source: str, dest: str, st: os.stat_result) -> None:
+        if stat.S_ISDIR(st.st_mode):
+            if not FilePermissions.can_read(st) or not FilePermissions.can_execute(st):
+                self.unreadable.append(source)
+                return
+            self.dirs.append((source, dest, st))
+        elif stat.S_ISREG(st.st_mode):
+            if not FilePermissions.can_read(st):
+                self.unreadable.append(source)
+                return
+            self.files.append((source, dest, st))
+            self.total_bytes += st.st_size
+        # Other special files are not copied
+
+    @staticmethod
+    def merge(parts: list[Manifest]) -> Manifest:
+        ans = Manifest()
+        for h in parts:
+            ans.dirs += h.dirs
+            ans.files += h.files
+            ans.links += h.links
+            ans.unreadable += h.unreadable
+            ans.total_bytes += h.total_bytes
+        return ans
+
+    @staticmethod
+    def build(instructions: list[tuple[str, str]],
+              follow_symlinks: bool = True) -> Manifest:
+        # Symlinks inside the trees are recorded as symlinks; the sources
+        # themselves are followed unless follow_symlinks is False
+        ans = Manifest()
+        for source, dest in instructions:
+            if not follow_symlinks and os.path.islink(source):
+                ans.links.append((os.readlink(source), dest))
+                continue
+            ans._add(source, dest, os.stat(source))
+
+        i = 0
+        while i < len(ans.dirs):
+            src_dir, dst_dir, _ = ans.dirs[i]
+            i += 1
+            try:
+                with os.scandir(src_dir) as it:
+                    for h in it:
+                        target = os.path.join(dst_dir, h.name)
+                        if h.is_symlink():
+                            ans.links.append((os.readlink(h.path), target))
+                        else:
+                            ans._add(h.path, target, h.stat(follow_symlinks=False))
+            except OSError:
+                ans.unreadable.append(src_dir)
+        return ans
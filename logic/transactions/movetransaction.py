@@ -1,5 +1,6 @@
 from __future__ import annotations
 import asyncio
+import errno
 import os
 import shutil
 from typing import *
@@ -7,6 +8,9 @@ from logic.permissions import FilePermissions
 from logic.selection import Selection
 from logic.workspacemanager import WorkspaceManager
 from logic.transactions.transaction import *
+from logic.transactions.copyengine import copy_all
+from logic.transactions.manifest import Manifest
+from logic.transactions.removeengine import remove
 
 
 class MoveTransaction(Transaction):
@@ -25,6 +29,7 @@ class MoveTransaction(Transaction):
     def _from_instructions(instructions: list) -> MoveTransaction:
         ans = MoveTransaction.__new__(MoveTransaction)
         ans._instructions = instructions
+        ans._progress_callback = None
         return ans
 
     def set_callback(self, callback: Callable) -> None:
@@ -40,25 +45,98 @@ class MoveTransaction(Transaction):
             if not os.access(source, os.W_OK):
                 return f"Cannot move file {source}"
 
-        total_size = calc_total_size([source for h in self._instructions])
+        try:
+            renames = self._plan()
+        except OSError as e:
+            return f"Error while moving {e.filename}: {e.strerror}"
+        self._progress = Progress(total_files=sum(renames))
+        self._begin()
+
+        def scan(source: str, dest: str) -> Manifest:
+            manifest = Manifest.build([(source, dest)], follow_symlinks=False)
+            if len(manifest.unreadable) > 0:
+                raise PermissionError(errno.EACCES, os.strerror(errno.EACCES),
+                                      manifest.unreadable[0])
+            self._progress.expect(bytes=manifest.total_bytes)
+            return manifest
+
+        def stream(i: int, source: str, manifest: Manifest) -> None:
+            # Across devices: copy with byte progress, then drop the source.
+            # Once the copy is journaled as complete, recovery finishes the
+            # removal instead of dropping the copy
+            copy_all(manifest, self._progress)
+            self._step(i)
+            remove(source)
 
         def real_op():
-            for h in self._instructions:
-                shutil.move(source, dest)
+            # Only the data that really has to travel is walked
+            manifests = [scan(source, dest) if not rename else None
+                         for (source, dest), rename in zip(self._instructions, renames)]
+            for i, ((source, dest), manifest) in enumerate(zip(self._instructions, manifests)):
+                if manifest is not None:
+                    stream(i, source, manifest)
+                    continue
+                try:
+                    os.rename(source, dest)
+                    self._progress.add(files=1)
+                except OSError as e:
+                    # Bind mounts of one filesystem share a device number
+                    if e.errno != errno.EXDEV:
+                        raise
+                    stream(i, source, scan(source, dest))
 
         async def reports(cancellation: asyncio.Event) -> None:
             while not cancellation.is_set():
-                cur_size = calc_total_size([h[1] for h in self._instructions])
-                share = cur_size / total_size if total_size != 0 else 1
                 if self._progress_callback is not None:
-                    self._progress_callback(share)
+                    self._progress_callback(self._progress.share())
                 await asyncio.sleep(0.2)
 
         cancel_reports = asyncio.Event()
         asyncio.create_task(reports(cancel_reports))
-        await asyncio.to_thread(real_op)
-        cancel_reports.set()
-        WorkspaceManager.rebuild_all()
+        try:
+            await asyncio.to_thread(real_op)
+        except OSError as e:
+            return f"Error while moving {e.filename}: {e.strerror}"
+        finally:
+            cancel_reports.set()
+            self._changed([os.path.dirname(h[i])
+                          for h in self._instructions for i in [0, 1]])
+
+    def _plan(self) -> list[bool]:
+        # True for the instructions that are a single rename(2): the source
+        # and the destination directory are on the same device
+        return [os.lstat(source).st_dev == os.stat(os.path.dirname(dest)).st_dev
+                for source, dest in self._instructions]
+
+    def get_progress(self) -> Progress:
+        return self._progress
+
+    def to_record(self) -> dict:
+        return {"type": "MoveTransaction", "instructions": self._instructions}
+
+    @staticmethod
+    def _from_record(record: dict) -> MoveTransaction:
+        return MoveTransaction._from_instructions(
+            [tuple(h) for h in record["instructions"]])
+
+    def recover(self) -> MoveTransaction | None:
+        # Moves whose source is gone are done. Where both sides exist, a
+        # copy journaled as complete had its source partly removed, so the
+        # removal is finished; otherwise the destination is an unfinished
+        # cross-device copy and is dropped
+        done = []
+        for i, (source, dest) in enumerate(self._instructions):
+            if not os.path.lexists(dest):
+                continue
+            if os.path.lexists(source):
+                if i not in self._journal_steps:
+                    remove(dest)
+                    continue
+                remove(source)
+            done.append((source, dest))
+        if len(done) == 0:
+            return None
+        return MoveTransaction._from_instructions(done).revert()
 
     def revert(self) -> MoveTransaction:
         return MoveTransaction._from_instructions(
@@ -69,3 +147,4 @@ class MoveSingleTransaction(MoveTransaction):
     def __init__(self, path: str, new_path: str) -> None:
         self._instructions = MoveTransaction._from_instructions(
             [(path, new_path)])._instructions
+        self._progress_callback = None
@@ -0,0 +1,107 @@
+from __future__ import annotations
+import os
+from concurrent.futures import ThreadPoolExecutor
+from logic.transactions.transaction import Progress
+
+
+# Everything below works relative to an open directory descriptor, so a
+# subtree that is renamed or replaced by a symlink while it is being
+# removed can not redirect the removal somewhere else. The totals of the
+# progress grow as the directories are listed, so the tree is walked once
+
+
+def _open_dir(name: str, dir_fd: int | None, path: str) -> int:
+    try:
+        return os.open(name, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW,
+                       dir_fd=dir_fd)
+    except OSError as e:
+        raise OSError(e.errno, e.strerror, path)
+
+
+def _list(fd: int, path: str, progress: Progress) -> list[tuple[str, bool]]:
+    try:
+        with os.scandir(fd) as it:
+            ans = [(h.name, h.is_dir(follow_symlinks=False)) for h in it]
+    except OSError as e:
+        raise OSError(e.errno, e.strerror, path)
+    progress.expect(files=len(ans))
+    return ans
+
+
+def _unlink(name: str, dir_fd: int, path: str, progress: Progress) -> None:
+    try:
+        os.unlink(name, dir_fd=dir_fd)
+    except OSError as e:
+        raise OSError(e.errno, e.strerror, os.path.join(path, name))
+    progress.add(files=1)
+
+
+def _rmdir(name: str, dir_fd: int | None, path: str, progress: Progress) -> None:
+    try:
+        os.rmdir(name, dir_fd=dir_fd)
+    except OSError as e:
+        raise OSError(e.errno, e.strerror, path)
+    progress.add(files=1)
+
+
+def _remove_file(path: str, progress: Progress) -> None:
+    try:
+        os.unlink(path)
+    except OSError as e:
+        raise OSError(e.errno, e.strerror, path)
+    progress.add(files=1)
+
+
+def _remove_tree(dir_fd: int, name: str, path: str, progress: Progress) -> None:
+    fd = _open_dir(name, dir_fd, path)
+    try:
+        for child, is_dir in _list(fd, path, progress):
+            if is_dir:
+                _remove_tree(fd, child, os.path.join(path, child), progress)
+            else:
+                _unlink(child, fd, path, progress)
+    finally:
+        os.close(fd)
+    _rmdir(name, dir_fd, path, progress)
+
+
+def remove_all(paths: list[str], progress: Progress, workers: int = 1) -> None:
+    # The top level of every directory is listed here; the subdirectories
+    # found there are independent and are removed by a pool of threads
+    opened = []
+    tasks = []
+    progress.expect(files=len(paths))
+    try:
+        for path in paths:
+            if not os.path.isdir(path) or os.path.islink(path):
+                _remove_file(path, progress)
+                continue
+            fd = _open_dir(path, None, path)
+            opened.append((path, fd))
+            for child, is_dir in _list(fd, path, progress):
+                if is_dir:
+                    tasks.append((fd, child, os.path.join(path, child)))
+                else:
+                    _unlink(child, fd, path, progress)
+
+        if workers <= 1 or len(tasks) <= 1:
+            for fd, child, path in tasks:
+                _remove_tree(fd, child, path, progress)
+        else:
+            with ThreadPoolExecutor(workers) as pool:
+                futures = [pool.submit(_remove_tree, fd, child, path, progress)
+                           for fd, child, path in tasks]
+            # Every subtree gets its chance before the first error is reported
+            for h in futures:
+                if h.exception() is not None:
+                    raise h.exception()
+    finally:
+        for path, fd in opened:
+            os.close(fd)
+
+    for path, fd in opened:
+        _rmdir(path, None, path, progress)
+
+
+def remove(path: str, progress: Progress | None = None) -> None:
+    remove_all([path], Progress() if progress is None else progress)
@@ -1,19 +1,31 @@
 from __future__ import annotations
 import asyncio
 import os
-import shutil
 from typing import *
 from logic.permissions import FilePermissions
 from logic.selection import Selection
 from logic.workspacemanager import WorkspaceManager
 from logic.transactions.transaction import *
+from logic.transactions.removeengine import remove_all
 
 
 class RemoveTransaction(Transaction):
-    def __init__(self, files: Selection) -> None:
+    @staticmethod
+    def reports_progress() -> bool:
+        return True
+
+    # Independent subtrees are removed by a pool of that many threads
+    default_workers = 4
+
+    def __init__(self, files: Selection, workers: int | None = None) -> None:
         self._files = files.get_list()
+        self._progress_callback = None
+        self._workers = RemoveTransaction.default_workers if workers is None else workers
         super().__init__()
 
+    def set_callback(self, callback: Callable) -> None:
+        self._progress_callback = callback
+
     async def execute(self, progress_callback: None |
                       Callable[..., Any] = None) -> None | str:
         if len(self._files) == 0:
@@ -25,12 +37,37 @@ class RemoveTransaction(Transaction):
                     os.path.dirname(h), os.X_OK) or (os.path.isdir(h) and not os.access(h, os.X_OK))):
                 return f"Cannot delete file {h}"
 
-        for h in self._files:
-            if os.path.isdir(h):
-                shutil.rmtree(h)
-            else:
-                os.remove(h)
-        WorkspaceManager.rebuild_all()
+        self._progress = Progress()
+        self._begin()
+
+        def real_op():
+            remove_all(self._files, self._progress, self._workers)
+
+        async def reports(cancellation: asyncio.Event) -> None:
+            while not cancellation.is_set():
+                if self._progress_callback is not None:
+                    self._progress_callback(self._progress.share())
+                await asyncio.sleep(0.2)
+
+        cancel_reports = asyncio.Event()
+        asyncio.create_task(reports(cancel_reports))
+        try:
+            await asyncio.to_thread(real_op)
+        except OSError as e:
+            return f"Error while removing {e.filename}: {e.strerror}"
+        finally:
+            cancel_reports.set()
+            self._changed([os.path.dirname(h) for h in self._files])
+
+    def get_progress(self) -> Progress:
+        return self._progress
+
+    def to_record(self) -> dict:
+        return {"type": "RemoveTransaction", "files": self._files}
+
+    @staticmethod
+    def _from_record(record: dict) -> RemoveTransaction:
+        return RemoveTransaction(Selection(record["files"]))
 
     def revert(self) -> DoNothingTransaction:
         return DoNothingTransaction()
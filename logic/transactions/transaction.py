@@ -2,13 +2,21 @@ from __future__ import annotations
 import asyncio
 import os
 import shutil
+import threading
 from typing import *
 from logic.permissions import FilePermissions
 from logic.selection import Selection
+from logic.sizeindex import SizeIndex
+from logic.transactions.journal import Journal
 from logic.workspacemanager import WorkspaceManager
 
 
 class Transaction:
+    # Set by _begin when the intent went to the journal
+    _journal_id: int | None = None
+    # Set by the journal before recover(): the steps recorded with _step
+    _journal_steps: set[int] = frozenset()
+
     def __init__(self) -> None:
         pass
 
@@ -23,17 +31,69 @@ class Transaction:
     def reports_progress() -> bool:
         return False
 
+    def to_record(self) -> dict:
+        # What the journal stores to rebuild the transaction; see _from_record
+        raise NotImplementedError()
+
+    def recover(self) -> Transaction | None:
+        # Called on startup for a transaction whose intent is journaled but
+        # that never finished. Leaves the disk consistent and returns the
+        # undo of whatever part was done.
+        return None
+
+    def _begin(self) -> None:
+        # Once the plan is fixed, before the first change on disk
+        self._journal_id = Journal.begin(self)
+
+    def _step(self, *steps: int) -> None:
+        # Durably records that these parts got past the point of no return,
+        # with a single fsync
+        if self._journal_id is not None and len(steps) > 0:
+            Journal.step(self._journal_id, list(steps))
+
+    @staticmethod
+    def _changed(paths: Iterable[str]) -> None:
+        # Entries under these directories were added or removed
+        for h in set(paths):
+            SizeIndex.invalidate(h)
+        WorkspaceManager.rebuild_all()
+
+
+class Progress:
+    # Counters shared between the threads doing the work and the coroutine
+    # reporting it, so that reporting never has to look at the disk
+    def __init__(self, total_bytes: int = 0, total_files: int = 0) -> None:
+        self._lock = threading.Lock()
+        self.total_bytes = total_bytes
+        self.total_files = total_files
+        self.bytes_done = 0
+        self.files_done = 0
+
+    def add(self, bytes: int = 0, files: int = 0) -> None:
+        with self._lock:
+            self.bytes_done += bytes
+            self.files_done += files
+
+    def expect(self, bytes: int = 0, files: int = 0) -> None:
+        with self._lock:
+            self.total_bytes += bytes
+            self.total_files += files
+
+    def share(self) -> float:
+        if self.total_bytes != 0:
+            return min(self.bytes_done / self.total_bytes, 1)
+        if self.total_files != 0:
+            return min(self.files_done / self.total_files, 1)
+        return 1
+
 
 def calc_size(path: str) -> int:
     if not os.path.exists(path):
         return 0
     if not os.path.isdir(path):
         return os.path.getsize(path)
-    ans = 0
-    for curdir, subdirs, subfiles in os.walk(path):
-        for hh in subdirs + subfiles:
-            ans += os.path.getsize(os.path.join(curdir, hh))
-    return ans
+    # Only the data of regular files, which is what the copy engine counts
+    return SizeIndex.calc(path)
 
 
 def calc_total_size(paths: Iterable[str]) -> int:
@@ -53,3 +113,10 @@ class DoNothingTransaction(Transaction):
 
     def revert(self) -> Transaction:
         return DoNothingTransaction()
+
+    def to_record(self) -> dict:
+        return {"type": "DoNothingTransaction"}
+
+    @staticmethod
+    def _from_record(record: dict) -> DoNothingTransaction:
+        return DoNothingTransaction()
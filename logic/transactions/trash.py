@@ -0,0 +1,145 @@
+from __future__ import annotations
+import errno
+import os
+import threading
+import time
+from logic.sizeindex import SizeIndex
+from logic.transactions.transaction import Progress
+from logic.transactions.removeengine import remove_all
+
+
+class Trash:
+    # One trash directory per filesystem, so that putting something there
+    # is a single rename. Entries are named "<time_ns>-<name>", which is
+    # all the purge needs to know about them.
+    max_age = 30 * 24 * 60 * 60
+    max_bytes = 4 * 1024 ** 3
+    # Entries this young are kept whatever the budget, so that a delete can
+    # still be undone right after it, however large it was
+    grace = 24 * 60 * 60
+
+    _dirs: set[str] = set()
+    _purge_lock = threading.Lock()
+
+    @staticmethod
+    def home_dir() -> str:
+        data = os.environ.get("XDG_DATA_HOME") or os.path.join(
+            os.path.expanduser("~"), ".local", "share")
+        return os.path.join(data, "filemgr", "trash")
+
+    @staticmethod
+    def _device(path: str) -> int:
+        # Device of path, or of its closest existing ancestor
+        while True:
+            try:
+                return os.lstat(path).st_dev
+            except FileNotFoundError:
+                parent = os.path.dirname(path)
+                if parent == path:
+                    raise
+                path = parent
+
+    @staticmethod
+    def _mount_point(path: str) -> str:
+        path = os.path.abspath(path)
+        dev = os.lstat(path).st_dev
+        while True:
+            parent = os.path.dirname(path)
+            if parent == path or os.lstat(parent).st_dev != dev:
+                return path
+            path = parent
+
+    @classmethod
+    def location(cls, path: str) -> str:
+        # Trash directory on the filesystem of path, created if needed
+        dev = os.lstat(path).st_dev
+        home = cls.home_dir()
+        if cls._device(home) == dev:
+            ans = home
+        else:
+            ans = os.path.join(cls._mount_point(os.path.dirname(os.path.abspath(path))),
+                               f".filemgr-trash-{os.getuid()}")
+        # On a read-only filesystem, or a mount root the user can't write
+        # to, there is no trash: this raises, and the caller reports it
+        os.makedirs(ans, mode=0o700, exist_ok=True)
+        if not os.access(ans, os.W_OK | os.X_OK):
+            raise PermissionError(errno.EACCES, os.strerror(errno.EACCES), ans)
+        cls._dirs.add(ans)
+        return ans
+
+    @classmethod
+    def target(cls, path: str) -> str:
+        # Free name in the trash that path can be renamed to
+        trash = cls.location(path)
+        name = os.path.basename(os.path.normpath(path))
+        while True:
+            ans = os.path.join(trash, f"{time.time_ns()}-{name}")
+            if not os.path.lexists(ans):
+                return ans
+
+    @classmethod
+    def put(cls, path: str) -> str:
+        # Moves path to the trash and returns where it ended up
+        ans = cls.target(path)
+        os.rename(path, ans)
+        return ans
+
+    @staticmethod
+    def _entries(trash: str) -> list[tuple[int, str]]:
+        ans = []
+        try:
+            with os.scandir(trash) as it:
+                for h in it:
+                    stamp = h.name.split("-", 1)[0]
+                    if stamp.isdigit():
+                        ans.append((int(stamp), h.path))
+        except OSError:
+            return []
+        ans.sort()
+        return ans
+
+    @staticmethod
+    def _size(path: str) -> int:
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                return SizeIndex.calc(path)
+            return os.lstat(path).st_size
+        except OSError:
+            return 0
+
+    @classmethod
+    def purge(cls, max_age: float | None = None, max_bytes: int | None = None,
+              grace: float | None = None) -> None:
+        # Drops what is older than max_age seconds, then the oldest entries
+        # past the grace period until each trash directory fits in
+        # max_bytes. Meant to be run on a worker thread; concurrent calls
+        # are folded into one.
+        max_age = cls.max_age if max_age is None else max_age
+        max_bytes = cls.max_bytes if max_bytes is None else max_bytes
+        grace = cls.grace if grace is None else grace
+        if not cls._purge_lock.acquire(blocking=False):
+            return
+        try:
+            dirs = set(cls._dirs)
+            dirs.add(cls.home_dir())
+            now = time.time_ns()
+            deadline = now - int(max_age * 10 ** 9)
+            fresh = now - int(grace * 10 ** 9)
+            for trash in dirs:
+                entries = cls._entries(trash)
+                doomed = [h[1] for h in entries if h[0] < deadline]
+                kept = [h for h in entries if h[0] >= deadline]
+                sizes = [cls._size(h[1]) for h in kept]
+                total = sum(sizes)
+                for (stamp, path), size in zip(kept, sizes):
+                    if total <= max_bytes or stamp >= fresh:
+                        break
+                    doomed.append(path)
+                    total -= size
+                for h in doomed:
+                    try:
+                        remove_all([h], Progress())
+                    except OSError:
+                        pass
+        finally:
+            cls._purge_lock.release()
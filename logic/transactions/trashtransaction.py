@@ -0,0 +1,131 @@
+from __future__ import annotations
+import asyncio
+import os
+from typing import *
+from logic.selection import Selection
+from logic.transactions.trash import Trash
+from logic.transactions.transaction import *
+
+
+class TrashTransaction(Transaction):
+    # Removal that can be undone: every file is renamed into the trash of
+    # its own filesystem, and the real unlinking is left to Trash.purge
+    def __init__(self, files: Selection) -> None:
+        self._files = files.get_list()
+        self._instructions = []
+        super().__init__()
+
+    async def execute(self) -> None | str:
+        if len(self._files) == 0:
+            return "No files selected for removal"
+        for h in self._files:
+            if not os.path.lexists(h):
+                return f"File {h} does not exist"
+            if (not os.access(os.path.dirname(h), os.W_OK) or not os.access(
+                    os.path.dirname(h), os.X_OK)):
+                return f"Cannot delete file {h}"
+            try:
+                Trash.location(h)
+            except OSError as e:
+                return (f"There is no trash for {h}: cannot use {e.filename} "
+                        f"({e.strerror}). Shift-Delete deletes it permanently")
+
+        try:
+            self._instructions = [(h, Trash.target(h)) for h in self._files]
+        except OSError as e:
+            self._instructions = []
+            return f"Cannot move {e.filename} to the trash: {e.strerror}"
+        self._begin()
+
+        done = 0
+        try:
+            for source, trashed in self._instructions:
+                os.rename(source, trashed)
+                done += 1
+        except OSError as e:
+            failed = self._instructions[done][0]
+            # All or nothing, so that the undo always has the whole selection
+            for source, trashed in reversed(self._instructions[:done]):
+                try:
+                    os.rename(trashed, source)
+                except OSError:
+                    pass
+            self._instructions = []
+            return f"Cannot move {failed} to the trash: {e.strerror}"
+        finally:
+            self._changed([os.path.dirname(h) for h in self._files])
+
+        asyncio.create_task(asyncio.to_thread(Trash.purge))
+
+    def to_record(self) -> dict:
+        return {"type": "TrashTransaction", "instructions": self._instructions}
+
+    @staticmethod
+    def _from_record(record: dict) -> TrashTransaction:
+        ans = TrashTransaction(Selection([h[0] for h in record["instructions"]]))
+        ans._instructions = [tuple(h) for h in record["instructions"]]
+        return ans
+
+    def recover(self) -> RestoreTransaction | None:
+        done = [(source, trashed) for source, trashed in self._instructions
+                if os.path.lexists(trashed) and not os.path.lexists(source)]
+        if len(done) == 0:
+            return None
+        return RestoreTransaction(done)
+
+    def revert(self) -> RestoreTransaction:
+        return RestoreTransaction(self._instructions)
+
+
+class RestoreTransaction(Transaction):
+    # Undo of a TrashTransaction: renames the entries back from the trash.
+    # Unlike a move, that needs no write access to the entries themselves,
+    # only to the directories on both sides
+    def __init__(self, instructions: list[tuple[str, str]]) -> None:
+        # (original path, path in the trash)
+        self._instructions = list(instructions)
+        super().__init__()
+
+    async def execute(self) -> None | str:
+        for source, trashed in self._instructions:
+            if os.path.lexists(source):
+                return f"File {source} already exists"
+            if not os.path.lexists(trashed):
+                return f"File {trashed} is no longer in the trash"
+            for h in [os.path.dirname(source), os.path.dirname(trashed)]:
+                if not os.access(h, os.W_OK) or not os.access(h, os.X_OK):
+                    return f"Cannot restore file {source}"
+        self._begin()
+
+        done = 0
+        try:
+            for source, trashed in self._instructions:
+                os.rename(trashed, source)
+                done += 1
+        except OSError as e:
+            failed = self._instructions[done][0]
+            for source, trashed in reversed(self._instructions[:done]):
+                try:
+                    os.rename(source, trashed)
+                except OSError:
+                    pass
+            return f"Cannot restore file {failed}: {e.strerror}"
+        finally:
+            self._changed([os.path.dirname(h[0]) for h in self._instructions])
+
+    def to_record(self) -> dict:
+        return {"type": "RestoreTransaction", "instructions": self._instructions}
+
+    @staticmethod
+    def _from_record(record: dict) -> RestoreTransaction:
+        return RestoreTransaction([tuple(h) for h in record["instructions"]])
+
+    def recover(self) -> TrashTransaction | None:
+        done = [source for source, trashed in self._instructions
+                if os.path.lexists(source) and not os.path.lexists(trashed)]
+        if len(done) == 0:
+            return None
+        return TrashTransaction(Selection(done))
+
+    def revert(self) -> TrashTransaction:
+        return TrashTransaction(Selection([h[0] for h in self._instructions]))
@@ -0,0 +1,118 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW)
+
+_event_header = struct.Struct("iIII")
+_libc = None
+
+
+def _get_libc() -> ctypes.CDLL:
+    global _libc
+    if _libc is None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        libc.inotify_add_watch.argtypes = [
+            ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        _libc = libc
+    return _libc
+
+
+class Watcher:
+    # Thin inotify binding. Every watched directory is shared by the owners
+    # (workspaces) that asked for it; read_events reports which owners an
+    # event belongs to.
+
+    def __init__(self) -> None:
+        self._libc = _get_libc()
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._paths: dict[int, str] = {}
+        self._owners: dict[int, list] = {}
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def watch(self, path: str, owner) -> bool:
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            # Symlinks and vanished directories are simply not watched
+            return ctypes.get_errno() in [errno.ENOTDIR, errno.ENOENT]
+        self._paths[wd] = path
+        owners = self._owners.setdefault(wd, [])
+        if owner not in owners:
+            owners.append(owner)
+        return True
+
+    def unwatch(self, owner) -> None:
+        for wd in list(self._owners.keys()):
+            owners = self._owners[wd]
+            if owner in owners:
+                owners.remove(owner)
+            if len(owners) == 0:
+                self._libc.inotify_rm_watch(self._fd, wd)
+                self._forget(wd)
+
+    def _forget(self, wd: int) -> None:
+        self._paths.pop(wd, None)
+        self._owners.pop(wd, None)
+
+    def read_events(self) -> list[tuple[list | None, str, int, str]]:
+        # Returns (owners, directory, mask, name); owners is None when the
+        # kernel queue overflowed and everything has to be rebuilt
+        ans = []
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if len(data) == 0:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = _event_header.unpack_from(
+                    data, offset)
+                offset += _event_header.size
+                name = os.fsdecode(
+                    data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    ans.append((None, "", mask, ""))
+                    continue
+                if wd not in self._paths:
+                    continue
+                ans.append((list(self._owners[wd]), self._paths[wd], mask, name))
+                if mask & IN_IGNORED:
+                    self._forget(wd)
+        return ans
+
+    def close(self) -> None:
+        os.close(self._fd)
+        self._paths.clear()
+        self._owners.clear()
@@ -1,90 +1,416 @@
-from os import listdir
+import asyncio
+import bisect
 import os.path
-from logic.file import *
-from typing import Iterable
+from logic.file import File
+from logic.workspacemanager import WorkspaceManager
+from typing import Callable, Iterable, Iterator
 from typing import Literal
-from functools import cmp_to_key
+from logic.pattern import FilePattern
 from logic.selection import Selection
+from logic.sizeindex import SizeIndex
 from logic.subscriptable import Subscriptable
+from logic.watcher import (IN_ATTRIB, IN_CLOSE_WRITE, IN_CREATE, IN_DELETE, IN_DELETE_SELF,
+                           IN_MODIFY, IN_MOVE_SELF, IN_MOVED_FROM, IN_MOVED_TO)
 
 
-def build_table(path=None, tree=False) -> Iterable[File]:
-    if (not tree):
-        return [File.fromPath(os.path.join(
-            "" if path is None else path, h)) for h in listdir(path)]
+def build_table(path=None, tree=False, limit: int | None = None) -> Iterable[File]:
+    # With a limit the enumeration stops as soon as more than limit entries
+    # were found, so callers can tell an overflow by the length alone
+    ans = []
+    stack = [(path, None)]
+    while len(stack) > 0:
+        dir, par = stack.pop()
+        try:
+            with os.scandir(dir) as it:
+                for h in it:
+                    cfile = File.from_dir_entry(h, par)
+                    ans.append(cfile)
+                    if tree and h.is_dir(follow_symlinks=False):
+                        stack.append((h.path, cfile))
+                    if limit is not None and len(ans) > limit:
+                        return ans
+        except OSError:
+            if not tree:
+                raise
+    return ans
+
 
-    walkres = os.walk(path)
+def read_chunk(iterator: Iterator[os.DirEntry], size: int) -> list[File]:
+    # Runs on a worker thread: the stat snapshots are taken here as well, so
+    # the event loop only has to sort and draw
     ans = []
-    binds = {}
-    for (dir, dirnames, filenames) in walkres:
-        total = dirnames + filenames
-        for h in total:
-            cfile = File.fromPath(os.path.join(
-                dir, h), None if dir not in binds else binds[dir])
-            binds[cfile.getPath()] = cfile
-            ans.append(cfile)
-        if (len(ans) > 1500):
+    for h in iterator:
+        cfile = File.from_dir_entry(h)
+        cfile.get_stat()
+        ans.append(cfile)
+        if len(ans) >= size:
             break
     return ans
 
 
 class Workspace(Subscriptable):
+    max_entries = 1000
+    background_loading = True
+    # The first chunk is small so that the first screen appears at once
+    first_chunk = 64
+    max_chunk = 4096
+    # Event batches this long, and longer than this share of the listing,
+    # make apply_events rebuild instead of patching
+    min_rebuild_batch = 64
+    max_patch_share = 0.25
+
     def __del__(self) -> None:
         WorkspaceManager._instances.remove(self)
 
-    def __init__(self, path) -> None:
+    def __init__(self, path, scan: bool = True) -> None:
+        # Without scan the workspace starts out empty and loading until
+        # load() is called
         super().__init__()
         self._path = os.path.abspath(path)
         self._sort = ("name", "asc")
         self._contents: list = None
         self._tree = False
-        self.rebuild()
+        self._live = False
+        self._loading = False
+        self._generation = 0
+        self._selection: set[File] = set()
+        # Met off the user's hands, e.g. by the watcher; see take_error
+        self._error: str | None = None
+        if scan:
+            self.rebuild()
+        else:
+            self._contents = []
+            self._loading = True
+            self._index_children()
+            self._index_positions()
         WorkspaceManager._instances.append(self)
 
     def get_tree(self) -> bool:
         return self._tree
 
+    def take_error(self) -> str | None:
+        # The panel shows it once, on the update that follows it
+        ans = self._error
+        self._error = None
+        return ans
+
     def set_tree(self, val: bool) -> None | str:
-        if len(build_table(self._path, val)) > 1000:
+        table = self._probe(self._path, val)
+        if table is None:
             return "Too many files"
         self._tree = val
 
-        self.rebuild()
+        self.rebuild(contents=table)
 
-    def rebuild(self, should_update: bool = False) -> None:
-        self._contents = build_table(self.get_path(), self._tree)
+    def _probe(self, path: str, tree: bool) -> list[File] | None:
+        # Flat listings are unbounded, but a tree walk is capped. The probe
+        # is handed on to rebuild, so it is the only scan
+        table = build_table(path, tree, self.max_entries if tree else None)
+        if tree and len(table) > self.max_entries:
+            return None
+        return table
 
-        prop, sort_type = self._sort
-        reverse = -1 if sort_type == "desc" else 1
-
-        def cmp(x: File, y: File, reverse: int) -> int:
-            c = 1
-
-            if x.get_depth() > y.get_depth():
-                x, y = y, x
-                c *= -1
-
-            y = y.get_kth_par(y.get_depth() - x.get_depth())
-            if y == x:
-                return -1 * c
-
-            if x._par != y._par:
-                return cmp(x._par, y._par, reverse) * c
-            xkey = File.props[prop](x)
-            ykey = File.props[prop](y)
-            if xkey < ykey:
-                return -1 * c * reverse
-            if xkey == ykey:
-                return (-1 if id(x) < id(y) else 1) * c * reverse
-            return 1 * c * reverse
-
-        def finalcmp(arg):
-            def wrap(x, y):
-                return cmp(x, y, arg)
-            return wrap
-        self._contents.sort(key=cmp_to_key(finalcmp(reverse)))
+    def rebuild(self, should_update: bool = False,
+                contents: list[File] | None = None) -> None | str:
+        # A tree that outgrew max_entries since it was opened is shown flat
+        # rather than cut short
+        error = None
+        if contents is None:
+            contents = self._probe(self.get_path(), self._tree)
+            if contents is None:
+                self._tree = False
+                contents = build_table(self.get_path())
+                error = "Too many files, switched to the flat view"
+        self._generation += 1
+        self._loading = False
+        self._contents = contents
+        self._selection = set()
+        self._index_children()
+        self._sort_contents()
+        self.refresh_watches()
+        self.start_sizing()
 
         self.send_update(should_update)
+        return error
+
+    def is_loading(self) -> bool:
+        return self._loading
+
+    def _can_load_in_background(self) -> bool:
+        if self._tree or not self.background_loading:
+            return False
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        return True
+
+    def _start_loading(self) -> None:
+        self._generation += 1
+        self._loading = True
+        self._contents = []
+        self._selection = set()
+        self._index_children()
+        self._index_positions()
+        self.refresh_watches()
+        asyncio.create_task(self._load(self._path, self._generation))
+        self.send_update()
+
+    async def _load(self, path: str, generation: int) -> None:
+        # Navigating away bumps the generation, which stops the loading
+        # after the chunk currently being read
+        size = self.first_chunk
+        try:
+            with os.scandir(path) as it:
+                while True:
+                    chunk = await asyncio.to_thread(read_chunk, it, size)
+                    if generation != self._generation or len(chunk) == 0:
+                        break
+                    self._add_chunk(chunk)
+                    size = min(size * 4, self.max_chunk)
+        except OSError as e:
+            # What was read so far stays, but is not passed off as complete
+            if generation == self._generation:
+                self._error = f"Cannot read {path}: {e.strerror}, the listing is incomplete"
+        if generation != self._generation:
+            return
+        self._loading = False
+        self.start_sizing()
+        self.send_update(True)
+
+    def _add_chunk(self, chunk: list[File]) -> None:
+        # The watcher may have added some of these already
+        chunk = [h for h in chunk if h.getPath() not in self._by_path]
+        for h in chunk:
+            self._by_path[h.getPath()] = h
+
+        # The contents are already sorted, so timsort only has to merge
+        prop, sort_type = self._sort
+        self._contents += chunk
+        self._contents.sort(key=File.props[prop], reverse=sort_type == "desc")
+        self._children[None] = list(self._contents)
+        self._index_positions()
+        self.send_update(True)
+
+    def start_sizing(self) -> None:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        asyncio.create_task(self._compute_sizes(self._generation))
+
+    async def _compute_sizes(self, generation: int) -> None:
+        # Recursive sizes of the listed directories are filled in on a worker
+        # thread, one directory at a time, until the listing changes
+        # Entries that vanished since the listing have no stat and are
+        # skipped, and so are mount points such as /proc: sizes stay on
+        # the filesystem of the listed directory
+        try:
+            dev = os.stat(self._path).st_dev
+        except OSError:
+            return
+        dirs = [h for h in self._contents if h.isDir() and h.get_stat() is not None
+                and h.get_stat().st_dev == dev and SizeIndex.lookup(h.get_stat()) is None]
+        for h in dirs:
+            if SizeIndex.lookup(h.get_stat()) is not None:
+                h.send_update()
+                continue
+            try:
+                await asyncio.to_thread(SizeIndex.calc, h.getPath())
+            except OSError:
+                continue
+            if generation != self._generation:
+                return
+            h.send_update()
+        if len(dirs) > 0 and self._sort[0] == "size":
+            self._sort_contents()
+            self.send_update(True)
+
+    def is_live(self) -> bool:
+        return self._live
+
+    def refresh_watches(self) -> None:
+        paths = [self._path]
+        if self._tree:
+            paths += [h.getPath() for h in self._contents if h.isDir()]
+        self._live = WorkspaceManager.watch(self, paths)
+
+    def _index_children(self) -> None:
+        self._children = {None: []}
+        self._by_path = {}
+        for h in self._contents:
+            self._children.setdefault(h._par, []).append(h)
+            self._by_path[h.getPath()] = h
+
+    def _sort_groups(self, parents: Iterable) -> dict:
+        prop, sort_type = self._sort
+        getter = File.props[prop]
+        rank = {}
+        for par in parents:
+            group = self._children[par]
+            group.sort(key=getter, reverse=sort_type == "desc")
+            for i, h in enumerate(group):
+                rank[h] = i
+        return rank
+
+    @staticmethod
+    def _sort_tree(files: list, rank: dict, root) -> None:
+        # Every entry is ranked among its siblings, then keyed by the ranks
+        # along its path from root, so one native sort yields the tree order
+        keys = {root: ()}
+        for h in files:  # parents are listed before their children
+            keys[h] = keys[h._par] + (rank[h],)
+        files.sort(key=keys.__getitem__)
+
+    def _sort_contents(self) -> None:
+        rank = self._sort_groups(list(self._children.keys()))
+        self._sort_tree(self._contents, rank, None)
+        self._index_positions()
+
+    def _index_positions(self) -> None:
+        # Contents are in pre-order, so every subtree is the contiguous range
+        # from its root up to the end of its last child's subtree
+        self._position = {h: i for i, h in enumerate(self._contents)}
+        if not self._tree:
+            self._subtree_end = {h: i + 1 for i, h in enumerate(self._contents)}
+            return
+        self._subtree_end = {}
+        for h in reversed(self._contents):
+            children = self._children.get(h)
+            if children:
+                self._subtree_end[h] = self._subtree_end[children[-1]]
+            else:
+                self._subtree_end[h] = self._position[h] + 1
+
+    def apply_events(self, events: list[tuple[str, int, str]]) -> None:
+        # Patches the listing from (directory, mask, name) events instead of
+        # listing and sorting everything again. Events only touch the
+        # sibling groups; the contents are laid out once per batch, and a
+        # batch that is large next to the listing is a rebuild instead
+        if (len(events) > self.min_rebuild_batch
+                and len(events) > len(self._contents) * self.max_patch_share):
+            if any(mask & (IN_DELETE_SELF | IN_MOVE_SELF) and dir == self._path
+                   for dir, mask, name in events):
+                self._path = self._existing_ancestor(self._path)
+            self.rebuild(True)
+            return
+        rewatch = False
+        for dir, mask, name in events:
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                if dir == self._path:
+                    self._path = self._existing_ancestor(self._path)
+                    self.rebuild(True)
+                    return
+                continue
+            if name == "":
+                continue
+            path = os.path.join(dir, name)
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                self._remove_entry(path)
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                self._remove_entry(path)
+                rewatch |= self._insert_entry(path, dir)
+            elif mask & (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE):
+                self._update_entry(path)
+        if self._tree and len(self._by_path) > self.max_entries:
+            # As in rebuild, a tree that outgrew max_entries goes flat
+            self._tree = False
+            self._error = "Too many files, switched to the flat view"
+            self.rebuild(True)
+            return
+        self._contents = self._lay_out()
+        self._index_positions()
+        if rewatch:
+            self.refresh_watches()
+        self.send_update(True)
+
+    @staticmethod
+    def _existing_ancestor(path: str) -> str:
+        while not os.path.isdir(path):
+            path = os.path.dirname(path)
+        return path
+
+    def _lay_out(self) -> list[File]:
+        # Pre-order walk of the sibling groups
+        ans = []
+        stack = list(reversed(self._children[None]))
+        while len(stack) > 0:
+            h = stack.pop()
+            ans.append(h)
+            children = self._children.get(h)
+            if children:
+                stack.extend(reversed(children))
+        return ans
+
+    def _insort(self, siblings: list[File], file: File) -> None:
+        # Binary search on the sort key, after the entries that compare equal
+        prop, sort_type = self._sort
+        getter = File.props[prop]
+        key = getter(file)
+        desc = sort_type == "desc"
+        lo, hi = 0, len(siblings)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = getter(siblings[mid])
+            if (value >= key) if desc else (value <= key):
+                lo = mid + 1
+            else:
+                hi = mid
+        siblings.insert(lo, file)
+
+    def _remove_entry(self, path: str) -> None:
+        file = self._by_path.get(path)
+        if file is None:
+            return
+        self._children[file._par].remove(file)
+        stack = [file]
+        while len(stack) > 0:
+            h = stack.pop()
+            self._selection.discard(h)
+            self._by_path.pop(h.getPath(), None)
+            stack += self._children.pop(h, [])
+
+    def _insert_entry(self, path: str, dir: str) -> bool:
+        if dir == self._path:
+            par = None
+        elif dir in self._by_path:
+            par = self._by_path[dir]
+        else:
+            return False
+        file = File.fromPath(path, par)
+        if file.get_stat() is None:
+            return False
+        if par is not None and par.getSelected() != False:
+            file._selected = "unavailable"
+
+        files = []
+        if self._tree and file.isDir() and not os.path.islink(path):
+            # Capped like any tree walk; apply_events sees the overflow
+            room = max(self.max_entries - len(self._by_path) - 1, 0)
+            for h in build_table(path, True, room):
+                if h._par is None:
+                    h._par = file
+                if file.getSelected() != False:
+                    h._selected = "unavailable"
+                files.append(h)
+        for h in files:
+            self._children.setdefault(h._par, []).append(h)
+            self._by_path[h.getPath()] = h
+        self._sort_groups([h for h in [file] + files if h in self._children])
+        self._by_path[path] = file
+        self._insort(self._children.setdefault(par, []), file)
+        return len(files) > 0 or file.isDir()
+
+    def _update_entry(self, path: str) -> None:
+        file = self._by_path.get(path)
+        if file is None:
+            return
+        file.refresh()
+        file.send_update()
+        if self._sort[0] != "name":
+            siblings = self._children[file._par]
+            siblings.remove(file)
+            self._insort(siblings, file)
 
     def get_contents(self) -> Iterable[File]:
         return self._contents
@@ -99,7 +425,8 @@ class Workspace(Subscriptable):
         # assert(prop in [h[0] for h in File.props])
         # assert(type in ["asc","desc"])
         self._sort = (prop, type)
-        self.rebuild(True)
+        self._sort_contents()
+        self.send_update(True)
 
     """ def update_view(self)->None:
         if self._callback_object is not None:
@@ -109,30 +436,94 @@ class Workspace(Subscriptable):
         self._callback_object=value """
 
     def get_children(self, file: File) -> list[File]:
-        return [h for h in self._contents if file in h.get_pars()]
-
-    def set_selected(self, file: File, value: bool) -> int:
-        if value == False:
-            file.setSelected(False)
-            for h in self.get_children(file):
-                h.setSelected(False)
-        if value == True:
-            file.setSelected(True)
-            for h in self.get_children(file):
-                h.setSelected('unavailable')
+        return self._contents[self._position[file] + 1:self._subtree_end[file]]
+
+    def _apply_selection(self, start: int, end: int,
+                         selected: Callable[[File], bool]) -> None:
+        # One pre-order pass over contents[start:end]: entries for which
+        # selected() holds become selected, everything below them
+        # unavailable, the rest unselected. Only the entries whose state
+        # changes are touched, and quietly; callers send one update at the end
+        cover_end = start
+        for i in range(start, end):
+            h = self._contents[i]
+            if i < cover_end:
+                value = "unavailable"
+            elif selected(h):
+                value = True
+                cover_end = self._subtree_end[h]
+            else:
+                value = False
+            if h.getSelected() != value:
+                h.setSelected(value, notify=False)
+            if value == True:
+                self._selection.add(h)
+            else:
+                self._selection.discard(h)
+
+    def set_selected(self, file: File, value: bool) -> None:
+        start = self._position[file]
+        self._apply_selection(start, self._subtree_end[file],
+                              lambda h: value and h is file)
+        self.send_update(refresh_rows=True)
+
+    def select_all(self) -> None:
+        top = set(self._children[None])
+        self._apply_selection(0, len(self._contents), top.__contains__)
+        self.send_update(refresh_rows=True)
+
+    def clear_selection(self) -> None:
+        self._apply_selection(0, len(self._contents), lambda h: False)
+        self.send_update(refresh_rows=True)
+
+    def invert_selection(self) -> None:
+        # Whatever was neither selected nor below a selection gets selected,
+        # topmost entries first. An entry with a selection below it would
+        # take that back in, so the pass descends into it instead
+        marks = sorted(self._position[h] for h in self._selection)
+
+        def outside(h: File) -> bool:
+            i = bisect.bisect_right(marks, self._position[h])
+            return i == len(marks) or marks[i] >= self._subtree_end[h]
+        self._apply_selection(0, len(self._contents),
+                              lambda h: h.getSelected() == False and outside(h))
+        self.send_update(refresh_rows=True)
+
+    def select_where(self, predicate: Callable[[File], bool]) -> None:
+        # Adds the entries matching predicate to the current selection
+        self._apply_selection(
+            0, len(self._contents),
+            lambda h: h.getSelected() == True or predicate(h))
+        self.send_update(refresh_rows=True)
+
+    def select_pattern(self, pattern: FilePattern) -> Selection:
+        # Adds every listed entry the pattern matches to the selection
+        matched = set(pattern.filter(self._contents))
+        self.select_where(matched.__contains__)
+        return self.get_selection()
 
     def step_in(self, path) -> None | str:
         if not os.access(path, os.X_OK) or not os.access(path, os.R_OK):
             return "Insufficient permissions to read the directory"
-        if len(build_table(path, self._tree)) > 1000:
+        if self._can_load_in_background():
+            self._path = path
+            self._start_loading()
+            return
+        table = self._probe(path, self._tree)
+        if table is None:
             return "Too many files"
         self._path = path
-        self.rebuild()
+        self.rebuild(contents=table)
         self.send_update()
 
+    def load(self) -> None | str:
+        return self.step_in(self._path)
+
     def step_up(self) -> None | str:
         return self.step_in(os.path.dirname(self._path))
 
     def get_selection(self) -> Selection:
-        return Selection([h.getPath()
-                         for h in self._contents if h.getSelected() == True])
+        # Everything below a selected entry is unavailable, so the set only
+        # holds the topmost entries
+        ordered = sorted(self._selection, key=self._position.__getitem__)
+        return Selection([h.getPath() for h in ordered])
@@ -1,6 +1,78 @@
+from logic.sizeindex import SizeIndex
+from logic.watcher import Watcher
+
+
 class WorkspaceManager:
     _instances = []
+    _watcher: Watcher | None = None
+    _watch_handle = None
+    _loop = None
 
     def rebuild_all() -> None:
+        # Watched workspaces are patched from inotify events instead
+        for h in WorkspaceManager._instances:
+            if not h.is_live():
+                h.rebuild()
+
+    @staticmethod
+    def enable_watcher(loop=None) -> bool:
+        try:
+            WorkspaceManager._watcher = Watcher()
+        except OSError:
+            return False
+        # loop is an urwid MainLoop, so that the screen is redrawn after the
+        # events are applied
+        if loop is not None:
+            WorkspaceManager._watch_handle = loop.watch_file(
+                WorkspaceManager._watcher.fileno(), WorkspaceManager.dispatch_events)
+            WorkspaceManager._loop = loop
+        for h in WorkspaceManager._instances:
+            h.refresh_watches()
+        return True
+
+    @staticmethod
+    def start_sizing() -> None:
+        for h in WorkspaceManager._instances:
+            h.start_sizing()
+
+    @staticmethod
+    def disable_watcher() -> None:
+        watcher = WorkspaceManager._watcher
+        if watcher is None:
+            return
+        if WorkspaceManager._loop is not None:
+            WorkspaceManager._loop.remove_watch_file(
+                WorkspaceManager._watch_handle)
+            WorkspaceManager._loop = None
+        WorkspaceManager._watcher = None
+        watcher.close()
         for h in WorkspaceManager._instances:
-            h.rebuild()
+            h.refresh_watches()
+
+    @staticmethod
+    def watch(workspace, paths: list[str]) -> bool:
+        watcher = WorkspaceManager._watcher
+        if watcher is None:
+            return False
+        watcher.unwatch(workspace)
+        return all([watcher.watch(h, workspace) for h in paths])
+
+    @staticmethod
+    def dispatch_events() -> None:
+        if WorkspaceManager._watcher is None:
+            return
+        batches = {}
+        changed = set()
+        for owners, path, mask, name in WorkspaceManager._watcher.read_events():
+            if owners is None:
+                SizeIndex.clear()
+                for h in WorkspaceManager._instances:
+                    h.rebuild(True)
+                return
+            changed.add(path)
+            for h in owners:
+                batches.setdefault(h, []).append((path, mask, name))
+        for h in changed:
+            SizeIndex.invalidate(h)
+        for workspace, events in batches.items():
+            workspace.apply_events(events)
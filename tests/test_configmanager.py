@@ -9,4 +9,78 @@ from logic.configmanager import ConfigManager
 def test_txt():
     assert(ConfigManager.get_command("/test1/test2.txt")!= None)
 def test_notxt():
-    assert(ConfigManager.get_command("/test1/test2.py")==None)
\ No newline at end of file
+    assert(ConfigManager.get_command("/test1/test2.py")==None)
+
+import json
+import tempfile
+import pytest
+
+
+@pytest.fixture
+def config():
+    global config_file
+    config_file=os.path.join(tempfile.mkdtemp(suffix="td"),"apps.json")
+    def write(mapping):
+        with open(config_file,"w") as f:
+            json.dump(mapping,f)
+        # The reload is keyed on the mtime
+        st=os.stat(config_file)
+        os.utime(config_file,ns=(st.st_atime_ns,st.st_mtime_ns+write.count))
+        write.count+=1
+    write.count=1
+    yield write
+    ConfigManager.load()
+
+
+def test_first_rule_wins(config):
+    config({r".*\.txt": "less $", r".*/notes/.*": "vim $", r".*": "open $"})
+    ConfigManager.load(config_file)
+    assert(ConfigManager.get_command("/a/b.txt")=="less /a/b.txt")
+    assert(ConfigManager.get_command("/notes/b.txt")=="less /notes/b.txt")
+    assert(ConfigManager.get_command("/notes/b.md")=="vim /notes/b.md")
+    assert(ConfigManager.get_command("/b.md")=="open /b.md")
+
+
+def test_backreferences(config):
+    config({r".*/(\w+)/\1\.c": "cc $", r".*\.c": "vim $"})
+    ConfigManager.load(config_file)
+    assert(ConfigManager.get_command("/x/main/main.c")=="cc /x/main/main.c")
+    assert(ConfigManager.get_command("/x/main/util.c")=="vim /x/main/util.c")
+
+
+def test_backreference_after_first_rule(config):
+    config({r".*\.txt": "a $", r".*/(\w+)/\1\.c": "b $", r".*/(?P<dir>\w+)/(?P=dir)\.h": "c $"})
+    ConfigManager.load(config_file)
+    assert(ConfigManager.get_command("/x/main/main.c")=="b /x/main/main.c")
+    assert(ConfigManager.get_command("/x/main/main.h")=="c /x/main/main.h")
+    assert(ConfigManager.get_command("/x/main/util.c") is None)
+
+
+def test_flags_in_later_rule(config):
+    config({r".*\.txt": "a $", r"(?i).*\.MD": "b $"})
+    ConfigManager.load(config_file)
+    assert(ConfigManager.get_command("/x/readme.md")=="b /x/readme.md")
+
+
+def test_reload_on_change(config):
+    config({r".*\.txt": "less $"})
+    ConfigManager.load(config_file)
+    assert(ConfigManager.get_command("/a.txt")=="less /a.txt")
+    assert(ConfigManager.get_command("/a.md") is None)
+    config({r".*\.md": "vim $"})
+    assert(ConfigManager.get_command("/a.txt") is None)
+    assert(ConfigManager.get_command("/a.md")=="vim /a.md")
+
+
+def test_rules_with_groups_are_joined(config):
+    config({r".*\.(jpg|png)": "feh $", r".*/(?:src|lib)/.*\.(c|h)": "vim $",
+            r".*/(\w+)/\1\.py": "python $", r".*\.(txt|md)": "less $", r".*\.(py)": "edit $"})
+    ConfigManager.load(config_file)
+    # Only the rule with a backreference is matched on its own
+    assert(len(ConfigManager._segments)==3)
+    assert(ConfigManager.get_command("/a.png")=="feh /a.png")
+    assert(ConfigManager.get_command("/x/src/a.h")=="vim /x/src/a.h")
+    assert(ConfigManager.get_command("/x/main/main.py")=="python /x/main/main.py")
+    assert(ConfigManager.get_command("/x/main/util.py")=="edit /x/main/util.py")
+    assert(ConfigManager.get_command("/notes.md")=="less /notes.md")
+    assert(ConfigManager.get_command("/a.gif") is None)
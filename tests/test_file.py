@@ -27,8 +27,17 @@ def test_size(setupfile):
 
     with open(tmp,"w") as file:
         file.write("abc")
+    assert tmp_file.getSize()==0
+    tmp_file.refresh()
     assert tmp_file.getSize()==3
 
+def test_executable(setupfile):
+    os.chmod(tmp,0o700)
+    assert tmp_file.is_executable()==os.access(tmp,os.X_OK)
+    os.chmod(tmp,0o600)
+    tmp_file.refresh()
+    assert tmp_file.is_executable()==os.access(tmp,os.X_OK)
+
 def test_date(setupfile):
     
     assert (tmp_file.get_modified().timestamp()-time.time())<1
@@ -46,3 +55,23 @@ def test_permissions(setupfile):
 tmpdir=None
 tmpdir_file=None
 
+
+def test_dir_entry(setupfile):
+    with open(tmp,"w") as file:
+        file.write("abc")
+    entry=[h for h in os.scandir(os.path.dirname(tmp)) if h.path==tmp][0]
+    entry_file=File.from_dir_entry(entry)
+    assert entry_file.getPath()==tmp
+    assert not entry_file.isDir()
+    assert entry_file.getSize()==3
+
+def test_version(setupfile):
+    version=tmp_file.get_version()
+    tmp_file.getSize()
+    tmp_file.getSize()
+    # Only the first snapshot counts as a change
+    assert(tmp_file.get_version()==version+1)
+    tmp_file.setSelected(True)
+    assert(tmp_file.get_version()==version+2)
+    tmp_file.refresh()
+    assert(tmp_file.get_version()==version+3)
@@ -0,0 +1,192 @@
+import asyncio
+import fcntl
+import os
+import tempfile
+import pytest
+from logic.scheduler import JobScheduler
+from logic.selection import Selection
+from logic.transactions import CopyTransaction, MakeDirectoryTransaction, MoveTransaction
+from logic.transactions.journal import Journal
+from logic.transactions.transaction import DoNothingTransaction
+
+
+@pytest.fixture
+def setupdir(monkeypatch):
+    global tmpdir, journal
+    tmpdir = tempfile.mkdtemp(suffix="td")
+    journal = os.path.join(tmpdir, "state", "journal.jsonl")
+    os.mkdir(os.path.join(tmpdir, "A"))
+    os.mkdir(os.path.join(tmpdir, "B"))
+    with open(os.path.join(tmpdir, "A", "x.txt"), "w") as f:
+        f.write("1")
+    with open(os.path.join(tmpdir, "A", "y.txt"), "w") as f:
+        f.write("11")
+    for h in ["_queue", "_jobs", "_undo"]:
+        monkeypatch.setattr(JobScheduler, h, [])
+    monkeypatch.setattr(JobScheduler, "_running", set())
+    monkeypatch.setattr(JobScheduler, "_finished", {})
+    monkeypatch.setattr(JobScheduler, "_seq", 0)
+    monkeypatch.setattr(JobScheduler, "_frontier", 0)
+    yield
+    Journal.close()
+
+
+@pytest.mark.asyncio
+async def test_history_across_sessions(setupdir):
+    Journal.open(journal)
+    JobScheduler.load_history()
+    job = JobScheduler.submit(MakeDirectoryTransaction(tmpdir))
+    assert (await job.wait() is None)
+    job = JobScheduler.submit(MoveTransaction(
+        Selection([os.path.join(tmpdir, "A", "x.txt")]), os.path.join(tmpdir, "B")))
+    assert (await job.wait() is None)
+    Journal.close()
+
+    # A new session gets the same undo history back from the file
+    Journal.open(journal)
+    JobScheduler.load_history()
+    undo = JobScheduler.submit(JobScheduler.pop_undo(), 1, undoable=False)
+    assert (await undo.wait() is None)
+    assert (os.path.exists(os.path.join(tmpdir, "A", "x.txt")))
+    Journal.close()
+
+    Journal.open(journal)
+    assert (len(Journal.history()) == 1)
+    undo = JobScheduler.submit(Journal.take_undo(Journal.history()[0]), 1, undoable=False)
+    assert (await undo.wait() is None)
+    assert (not os.path.exists(os.path.join(tmpdir, "Folder")))
+
+
+def test_recover_interrupted_move(setupdir):
+    Journal.open(journal)
+    a = os.path.join(tmpdir, "A")
+    move = MoveTransaction._from_instructions(
+        [(os.path.join(a, "x.txt"), os.path.join(tmpdir, "B", "x.txt")),
+         (os.path.join(a, "y.txt"), os.path.join(tmpdir, "B", "y.txt"))])
+    Journal.begin(move)
+    # The first file made it, the second is a half-done copy
+    os.rename(os.path.join(a, "x.txt"), os.path.join(tmpdir, "B", "x.txt"))
+    with open(os.path.join(tmpdir, "B", "y.txt"), "w") as f:
+        f.write("1")
+    Journal._file.close()
+    Journal._file = None
+
+    assert (len(Journal.open(journal)) == 1)
+    assert (not os.path.exists(os.path.join(tmpdir, "B", "y.txt")))
+    assert (os.path.exists(os.path.join(a, "y.txt")))
+    undo = Journal.take_undo(Journal.history()[0])
+    assert (undo._instructions == [(os.path.join(tmpdir, "B", "x.txt"),
+                                    os.path.join(a, "x.txt"))])
+
+
+def test_recover_move_after_copy(setupdir):
+    # A cross-device move crashed while removing the source of a complete
+    # copy: the copy has to survive and the removal has to be finished
+    Journal.open(journal)
+    src = os.path.join(tmpdir, "A")
+    dest = os.path.join(tmpdir, "B", "A")
+    move = MoveTransaction._from_instructions([(src, dest)])
+    move._begin()
+    os.mkdir(dest)
+    for name in ["x.txt", "y.txt"]:
+        with open(os.path.join(dest, name), "w") as f:
+            f.write("1")
+    move._step(0)
+    os.unlink(os.path.join(src, "x.txt"))
+    Journal._file.close()
+    Journal._file = None
+
+    assert (len(Journal.open(journal)) == 1)
+    assert (not os.path.exists(src))
+    assert (sorted(os.listdir(dest)) == ["x.txt", "y.txt"])
+    undo = Journal.take_undo(Journal.history()[0])
+    assert (undo._instructions == [(dest, src)])
+
+
+def test_recover_interrupted_copy(setupdir):
+    Journal.open(journal)
+    copy = CopyTransaction(Selection([os.path.join(tmpdir, "A")]),
+                           os.path.join(tmpdir, "B"))
+    Journal.begin(copy)
+    os.mkdir(os.path.join(tmpdir, "B", "A"))
+    with open(os.path.join(tmpdir, "B", "A", "x.txt"), "w") as f:
+        f.write("1")
+    # The last line was torn by the crash
+    Journal._file.write(b'{"op": "comm')
+    Journal._file.close()
+    Journal._file = None
+
+    assert (len(Journal.open(journal)) == 1)
+    assert (os.listdir(os.path.join(tmpdir, "B")) == [])
+    assert (Journal.history() == [])
+
+
+def test_second_instance_runs_without_journal(setupdir):
+    # The intent of a transaction that is still running in another instance
+    # is left alone, and so is the file it writes to
+    os.makedirs(os.path.dirname(journal))
+    copy = CopyTransaction(Selection([os.path.join(tmpdir, "A")]),
+                           os.path.join(tmpdir, "B"))
+    with open(journal, "wb") as f:
+        f.write(Journal._encode({"op": "intent", "id": 0, "tx": copy.to_record()}))
+    os.mkdir(os.path.join(tmpdir, "B", "A"))
+    with open(journal + ".lock", "ab") as owner:
+        fcntl.flock(owner.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        assert (len(Journal.open(journal)) == 1)
+        assert (not Journal.is_open())
+        assert (Journal.history() == [])
+        assert (os.path.exists(os.path.join(tmpdir, "B", "A")))
+        with open(journal, "rb") as f:
+            assert (f.read().count(b"intent") == 1)
+
+    # Once the other instance is gone, its intent is recovered
+    assert (len(Journal.open(journal)) == 1)
+    assert (Journal.is_open())
+    assert (not os.path.exists(os.path.join(tmpdir, "B", "A")))
+
+
+@pytest.mark.asyncio
+async def test_commit_before_earlier_job(setupdir):
+    # A copy that is done while an earlier job still runs is committed to
+    # the journal right away, so a crash does not take it for unfinished
+    Journal.open(journal)
+    JobScheduler.load_history()
+    release = asyncio.Event()
+
+    class WaitTransaction(DoNothingTransaction):
+        async def execute(self) -> None | str:
+            await release.wait()
+
+    slow = JobScheduler.submit(WaitTransaction())
+    copy = JobScheduler.submit(CopyTransaction(
+        Selection([os.path.join(tmpdir, "A")]), os.path.join(tmpdir, "B")))
+    assert (await copy.wait() is None)
+    assert (JobScheduler.pop_undo() is None)
+    Journal._file.close()
+    Journal._file = None
+
+    assert (Journal.open(journal) == [])
+    assert (sorted(os.listdir(os.path.join(tmpdir, "B", "A"))) == ["x.txt", "y.txt"])
+    assert (len(Journal.history()) == 1)
+    release.set()
+    await slow.wait()
+
+
+def test_recover_copy_with_finished_parts(setupdir):
+    Journal.open(journal)
+    copy = CopyTransaction(Selection([os.path.join(tmpdir, "A", "x.txt"),
+                                      os.path.join(tmpdir, "A", "y.txt")]),
+                           os.path.join(tmpdir, "B"))
+    copy._begin()
+    with open(os.path.join(tmpdir, "B", "x.txt"), "w") as f:
+        f.write("1")
+    copy._step(0)
+    with open(os.path.join(tmpdir, "B", "y.txt"), "w") as f:
+        f.write("1")
+    Journal._file.close()
+    Journal._file = None
+
+    assert (len(Journal.open(journal)) == 1)
+    assert (os.listdir(os.path.join(tmpdir, "B")) == ["x.txt"])
+    undo = Journal.take_undo(Journal.history()[0])
+    assert (undo._files == [os.path.join(tmpdir, "B", "x.txt")])
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import time
+import pytest
+from logic.pattern import FilePattern
+from logic.workspace import Workspace
+
+
+@pytest.fixture
+def setupdir():
+    global tmpdir
+    tmpdir=tempfile.mkdtemp(suffix="td")
+    old=time.time()-10*86400
+    for name,size,mtime in [("a.log",10,old),("b.log",5000,old),("c.log",10,None),("d.txt",10,old)]:
+        path=os.path.join(tmpdir,name)
+        with open(path,"w") as f:
+            f.write("x"*size)
+        if mtime is not None:
+            os.utime(path,(mtime,mtime))
+    global wspace
+    wspace=Workspace(tmpdir)
+
+
+def names(files):
+    return sorted(h.get_name() for h in files)
+
+
+def test_glob_and_regex(setupdir):
+    assert(names(FilePattern("*.log").filter(wspace.get_contents()))==["a.log","b.log","c.log"])
+    assert(names(FilePattern(r"^[ab]\.", regex=True).filter(wspace.get_contents()))==["a.log","b.log"])
+
+
+def test_filters(setupdir):
+    pattern=FilePattern.parse("*.log age>7d size<1K")
+    assert(pattern.min_age==7*86400 and pattern.max_size==1024)
+    assert(names(pattern.filter(wspace.get_contents()))==["a.log"])
+    assert(names(FilePattern.parse("re:log$ age<1h").filter(wspace.get_contents()))==["c.log"])
+    for h in ["", "*.log size=5", "*.log age>7y", "re:("]:
+        with pytest.raises(ValueError):
+            FilePattern.parse(h)
+
+
+def test_select_pattern(setupdir):
+    wspace.set_selected([h for h in wspace.get_contents() if h.get_name()=="d.txt"][0],True)
+    sel=wspace.select_pattern(FilePattern.parse("*.log size>1K"))
+    assert(sorted(os.path.basename(h) for h in sel.get_list())==["b.log","d.txt"])
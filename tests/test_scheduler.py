@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from logic.scheduler import JobScheduler
+from logic.transactions.transaction import DoNothingTransaction, Progress, Transaction
+
+
+class SleepTransaction(Transaction):
+    @staticmethod
+    def reports_progress() -> bool:
+        return True
+
+    def __init__(self, name: str, delay: float, log: list) -> None:
+        self._name = name
+        self._delay = delay
+        self._log = log
+        self._progress = Progress(total_files=1)
+
+    def set_callback(self, callback) -> None:
+        pass
+
+    def get_progress(self) -> Progress:
+        return self._progress
+
+    async def execute(self) -> None | str:
+        self._log.append(("start", self._name))
+        await asyncio.sleep(self._delay)
+        self._progress.add(files=1)
+        self._log.append(("end", self._name))
+        if self._name == "fail":
+            return "failed"
+
+    def revert(self) -> Transaction:
+        ans = DoNothingTransaction()
+        ans.name = self._name
+        return ans
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setattr(JobScheduler, "_queue", [])
+    monkeypatch.setattr(JobScheduler, "_running", set())
+    monkeypatch.setattr(JobScheduler, "_jobs", [])
+    monkeypatch.setattr(JobScheduler, "_finished", {})
+    monkeypatch.setattr(JobScheduler, "_undo", [])
+    monkeypatch.setattr(JobScheduler, "_seq", 0)
+    monkeypatch.setattr(JobScheduler, "_frontier", 0)
+    monkeypatch.setattr(JobScheduler, "max_running", 2)
+
+
+@pytest.mark.asyncio
+async def test_cap_and_priority(scheduler):
+    log = []
+    jobs = [JobScheduler.submit(SleepTransaction("a", 0.05, log)),
+            JobScheduler.submit(SleepTransaction("b", 0.05, log)),
+            JobScheduler.submit(SleepTransaction("c", 0.01, log)),
+            JobScheduler.submit(SleepTransaction("d", 0.01, log), priority=1)]
+    assert ([h.state for h in jobs] == ["running", "running", "queued", "queued"])
+    for h in jobs:
+        assert (await h.wait() is None)
+    starts = [h[1] for h in log if h[0] == "start"]
+    assert (starts == ["a", "b", "d", "c"])
+    assert (JobScheduler.jobs() == [])
+
+
+@pytest.mark.asyncio
+async def test_undo_order(scheduler):
+    log = []
+    slow = JobScheduler.submit(SleepTransaction("slow", 0.05, log))
+    fail = JobScheduler.submit(SleepTransaction("fail", 0.01, log))
+    quick = JobScheduler.submit(SleepTransaction("quick", 0.01, log))
+    await quick.wait()
+    # The later job is done, but its undo waits for the earlier one
+    assert (JobScheduler.pop_undo() is None)
+    assert (await fail.wait() == "failed")
+    await slow.wait()
+    assert (JobScheduler.pop_undo().name == "quick")
+    assert (JobScheduler.pop_undo().name == "slow")
+    assert (JobScheduler.pop_undo() is None)
@@ -0,0 +1,119 @@
+import os
+import tempfile
+import pytest
+from logic.file import File
+from logic.sizeindex import SizeIndex
+
+
+@pytest.fixture
+def setupdir():
+    global tmpdir
+    tmpdir = tempfile.mkdtemp(suffix="td")
+    os.makedirs(os.path.join(tmpdir, "A", "B"))
+    with open(os.path.join(tmpdir, "A", "x.txt"), "w") as f:
+        f.write("1")
+    with open(os.path.join(tmpdir, "A", "B", "y.txt"), "w") as f:
+        f.write("11")
+    os.symlink("x.txt", os.path.join(tmpdir, "A", "link"))
+
+
+def test_calc(setupdir):
+    apath = os.path.join(tmpdir, "A")
+    assert SizeIndex.calc(apath) == 3
+    assert SizeIndex.lookup(os.stat(apath)) == 3
+    assert File.fromPath(apath).getSize() == 3
+
+
+def test_invalidate(setupdir):
+    apath = os.path.join(tmpdir, "A")
+    ypath = os.path.join(tmpdir, "A", "B", "y.txt")
+    assert SizeIndex.calc(tmpdir) == 3
+    with open(ypath, "a") as f:
+        f.write("111")
+    # A content change does not touch the directory mtimes
+    assert SizeIndex.calc(tmpdir) == 3
+    SizeIndex.invalidate(ypath)
+    assert SizeIndex.lookup(os.stat(apath)) is None
+    assert SizeIndex.calc(tmpdir) == 6
+
+    os.remove(ypath)
+    # The directory that lost an entry has a new mtime
+    assert SizeIndex.lookup(os.stat(os.path.join(tmpdir, "A", "B"))) is None
+    SizeIndex.invalidate(os.path.join(tmpdir, "A", "B"))
+    assert SizeIndex.calc(tmpdir) == 1
+
+
+def test_persistence(setupdir):
+    apath = os.path.join(tmpdir, "A")
+    file = os.path.join(tmpdir, "index.json")
+    SizeIndex.calc(apath)
+    SizeIndex.save(file)
+    SizeIndex.clear()
+    assert SizeIndex.lookup(os.stat(apath)) is None
+    SizeIndex.load(file)
+    assert SizeIndex.lookup(os.stat(apath)) == 3
+
+
+def test_lookup_without_stat():
+    assert SizeIndex.lookup(None) is None
+
+
+def test_pruning(setupdir, monkeypatch):
+    apath = os.path.join(tmpdir, "A")
+    bpath = os.path.join(tmpdir, "A", "B")
+    file = os.path.join(tmpdir, "index.json")
+    monkeypatch.setattr(SizeIndex, "max_sessions", 2)
+    SizeIndex.calc(apath)
+    SizeIndex.save(file)
+    # Only B is used in the next sessions, so A is dropped after two
+    for i in range(2):
+        SizeIndex.clear()
+        SizeIndex.load(file)
+        assert SizeIndex.lookup(os.stat(bpath)) == 2
+        SizeIndex.save(file)
+    SizeIndex.clear()
+    SizeIndex.load(file)
+    assert SizeIndex.lookup(os.stat(apath)) is None
+    assert SizeIndex.lookup(os.stat(bpath)) == 2
+
+    monkeypatch.setattr(SizeIndex, "max_entries", 0)
+    SizeIndex.save(file)
+    SizeIndex.clear()
+    SizeIndex.load(file)
+    assert SizeIndex.lookup(os.stat(bpath)) is None
+
+
+def test_calc_stays_on_device(setupdir, monkeypatch):
+    # B pretends to be a mount point of another filesystem, like /proc
+    # under /, and counts as empty as with du -x
+    scandir = os.scandir
+
+    class Entry:
+        def __init__(self, entry) -> None:
+            self._entry = entry
+            self.name = entry.name
+            self.path = entry.path
+            self.is_symlink = entry.is_symlink
+            self.is_dir = entry.is_dir
+            self.is_file = entry.is_file
+
+        def stat(self, follow_symlinks=True) -> os.stat_result:
+            st = self._entry.stat(follow_symlinks=follow_symlinks)
+            if self.name != "B":
+                return st
+            fields = list(st)
+            fields[2] = st.st_dev + 1
+            return os.stat_result(fields)
+
+    class Mounted:
+        def __init__(self, path) -> None:
+            self._it = scandir(path)
+
+        def __enter__(self):
+            return (Entry(h) for h in self._it.__enter__())
+
+        def __exit__(self, *args) -> None:
+            self._it.__exit__(*args)
+
+    monkeypatch.setattr(os, "scandir", Mounted)
+    assert SizeIndex.calc(os.path.join(tmpdir, "A")) == 1
@@ -1,3 +1,4 @@
+import errno
 import tempfile
 import pytest
 import os
@@ -149,3 +150,254 @@ async def test_mkdir(setupdir):
     res = await c4.execute()
     assert (res != None)
     await t1.revert().execute()
+
+
+@pytest.mark.asyncio
+async def test_copy_progress(setupdir):
+    apath = os.path.join(tmpdir, "A")
+    os.symlink("C/x.txt", os.path.join(apath, "link"))
+    shares = []
+    c1 = CopyTransaction(Selection([apath]), os.path.join(tmpdir, "D"))
+    os.mkdir(os.path.join(tmpdir, "D"))
+    c1.set_callback(shares.append)
+    assert (await c1.execute() is None)
+    progress = c1.get_progress()
+    assert (progress.bytes_done == 3)
+    assert (progress.files_done == 3)
+    assert (progress.share() == 1)
+    assert (os.readlink(os.path.join(tmpdir, "D", "A", "link")) == "C/x.txt")
+    with open(os.path.join(tmpdir, "D", "A", "B", "y.txt")) as f:
+        assert (f.read() == "11")
+    assert (all(0 <= h <= 1 for h in shares))
+
+
+@pytest.mark.asyncio
+async def test_parallel_copy(setupdir):
+    apath = os.path.join(tmpdir, "A")
+    for i in range(50):
+        with open(os.path.join(apath, "B", f"f{i}"), "w") as f:
+            f.write("x" * i)
+    os.mkdir(os.path.join(tmpdir, "D"))
+    c1 = CopyTransaction(Selection([apath, os.path.join(tmpdir, "A", "C", "x.txt")]),
+                         os.path.join(tmpdir, "D"), workers=8)
+    assert (await c1.execute() is None)
+    assert (c1.get_progress().files_done == 53)
+    assert (c1.get_progress().share() == 1)
+    for i in range(50):
+        assert (os.path.getsize(os.path.join(tmpdir, "D", "A", "B", f"f{i}")) == i)
+
+    await c1.revert().execute()
+    assert (os.listdir(os.path.join(tmpdir, "D")) == [])
+
+
+@pytest.mark.asyncio
+async def test_move_same_device(setupdir, monkeypatch):
+    import logic.transactions.movetransaction as movetransaction
+
+    def no_walk(*args, **kwargs):
+        raise AssertionError("a rename must not walk the tree")
+    monkeypatch.setattr(movetransaction.Manifest, "build", no_walk)
+    apath = os.path.join(tmpdir, "A")
+    os.mkdir(os.path.join(tmpdir, "D"))
+    c1 = MoveTransaction(Selection([apath]), os.path.join(tmpdir, "D"))
+    assert (await c1.execute() is None)
+    assert (c1.get_progress().files_done == 1)
+    assert (c1.get_progress().share() == 1)
+    assert (os.path.exists(os.path.join(tmpdir, "D", "A", "C", "x.txt")))
+
+
+@pytest.mark.asyncio
+async def test_move_cross_device(setupdir):
+    other = "/dev/shm"
+    if not os.path.isdir(other) or os.stat(other).st_dev == os.stat(tmpdir).st_dev:
+        pytest.skip("no second filesystem")
+    dest = tempfile.mkdtemp(dir=other)
+    apath = os.path.join(tmpdir, "A")
+    c1 = MoveTransaction(Selection([apath]), dest)
+    assert (await c1.execute() is None)
+    assert (c1.get_progress().bytes_done == 3)
+    assert (c1.get_progress().share() == 1)
+    assert (not os.path.exists(apath))
+    with open(os.path.join(dest, "A", "B", "y.txt")) as f:
+        assert (f.read() == "11")
+
+    await c1.revert().execute()
+    assert (os.path.exists(os.path.join(apath, "C", "x.txt")))
+    assert (os.listdir(dest) == [])
+
+
+@pytest.mark.asyncio
+async def test_remove_progress(setupdir):
+    apath = os.path.join(tmpdir, "A")
+    outside = tempfile.mkdtemp()
+    with open(os.path.join(outside, "keep.txt"), "w") as f:
+        f.write("1")
+    os.symlink(outside, os.path.join(apath, "B", "out"))
+    for i in range(20):
+        os.mkdir(os.path.join(apath, f"D{i}"))
+        with open(os.path.join(apath, f"D{i}", "z"), "w") as f:
+            f.write("z")
+    shares = []
+    # Every directory is listed once, by the removal itself through its
+    # descriptor; paths are listed by the workspaces rebuilt afterwards
+    listed = []
+    scandir = os.scandir
+
+    def counting(path):
+        if isinstance(path, int):
+            listed.append(path)
+        return scandir(path)
+    c1 = RemoveTransaction(Selection([apath]), workers=4)
+    c1.set_callback(shares.append)
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr(os, "scandir", counting)
+        assert (await c1.execute() is None)
+    assert (len(listed) == 23)
+    assert (not os.path.exists(apath))
+    # The symlink goes, the directory it points to stays
+    assert (os.path.exists(os.path.join(outside, "keep.txt")))
+    # A, B, C, x.txt, y.txt, out and the 20 directories with a file each
+    assert (c1.get_progress().files_done == 46)
+    assert (c1.get_progress().total_files == 46)
+    assert (c1.get_progress().share() == 1)
+    assert (all(0 <= h <= 1 for h in shares))
+
+
+@pytest.mark.asyncio
+async def test_trash_and_undo(setupdir, monkeypatch):
+    monkeypatch.setenv("XDG_DATA_HOME", os.path.join(tmpdir, "data"))
+    apath = os.path.join(tmpdir, "A")
+    c1 = TrashTransaction(Selection([apath]))
+    assert (await c1.execute() is None)
+    assert (not os.path.exists(apath))
+    trash = os.path.join(tmpdir, "data", "filemgr", "trash")
+    assert (len(os.listdir(trash)) == 1)
+
+    assert (await c1.revert().execute() is None)
+    assert (os.path.exists(os.path.join(apath, "C", "x.txt")))
+    assert (os.listdir(trash) == [])
+
+
+def test_trash_purge(setupdir, monkeypatch):
+    from logic.transactions.trash import Trash
+    monkeypatch.setenv("XDG_DATA_HOME", os.path.join(tmpdir, "data"))
+    trash = Trash.location(tmpdir)
+    old = os.path.join(trash, "1-old")
+    os.mkdir(old)
+    Trash.put(os.path.join(tmpdir, "A", "B", "y.txt"))
+    Trash.put(os.path.join(tmpdir, "A", "C", "x.txt"))
+    Trash.purge(max_age=3600)
+    assert (len(os.listdir(trash)) == 2)
+    # Over the budget the oldest entry goes first
+    Trash.purge(max_age=3600, max_bytes=1, grace=0)
+    assert ([h.split("-", 1)[1] for h in os.listdir(trash)] == ["x.txt"])
+
+
+@pytest.mark.asyncio
+async def test_trash_over_budget_and_undo(setupdir, monkeypatch):
+    from logic.transactions.trash import Trash
+    monkeypatch.setenv("XDG_DATA_HOME", os.path.join(tmpdir, "data"))
+    monkeypatch.setattr(Trash, "max_bytes", 100)
+    big = os.path.join(tmpdir, "big")
+    with open(big, "wb") as f:
+        f.write(b"x" * 1000)
+    c1 = TrashTransaction(Selection([big]))
+    assert (await c1.execute() is None)
+    # The purge started by the delete runs on a worker thread
+    Trash.purge()
+    assert (await c1.revert().execute() is None)
+    assert (os.path.getsize(big) == 1000)
+
+
+@pytest.mark.asyncio
+async def test_trash_rollback(setupdir, monkeypatch):
+    monkeypatch.setenv("XDG_DATA_HOME", os.path.join(tmpdir, "data"))
+    first = os.path.join(tmpdir, "A", "B", "y.txt")
+    second = os.path.join(tmpdir, "A", "C", "x.txt")
+    rename = os.rename
+
+    def failing(source, dest):
+        if source == second:
+            raise PermissionError(13, "Permission denied", source)
+        rename(source, dest)
+    monkeypatch.setattr(os, "rename", failing)
+    res = await TrashTransaction(Selection([first, second])).execute()
+    assert (res == f"Cannot move {second} to the trash: Permission denied")
+    assert (os.path.exists(first))
+
+
+@pytest.mark.asyncio
+async def test_trash_undo_read_only(setupdir, monkeypatch):
+    # Renaming back needs write access to the directories only, even for a
+    # user that is not root
+    monkeypatch.setenv("XDG_DATA_HOME", os.path.join(tmpdir, "data"))
+    access = os.access
+
+    def as_owner(path, mode):
+        if mode & os.W_OK and not os.lstat(path).st_mode & 0o200:
+            return False
+        return access(path, mode)
+    monkeypatch.setattr(os, "access", as_owner)
+    ypath = os.path.join(tmpdir, "A", "B", "y.txt")
+    os.chmod(ypath, 0o444)
+    c1 = TrashTransaction(Selection([ypath]))
+    assert (await c1.execute() is None)
+    assert (await c1.revert().execute() is None)
+    assert (os.path.exists(ypath))
+
+
+@pytest.mark.asyncio
+async def test_trash_unavailable(setupdir, monkeypatch):
+    from logic.transactions.trash import Trash
+    monkeypatch.setenv("XDG_DATA_HOME", os.path.join(tmpdir, "data"))
+    # Another filesystem whose root is read-only
+    monkeypatch.setattr(Trash, "_device", staticmethod(lambda path: -1))
+
+    def read_only(path, mode=0o777, exist_ok=False):
+        raise OSError(errno.EROFS, "Read-only file system", path)
+    monkeypatch.setattr(os, "makedirs", read_only)
+    apath = os.path.join(tmpdir, "A")
+    res = await TrashTransaction(Selection([apath])).execute()
+    assert (res.startswith(f"There is no trash for {apath}"))
+    assert ("Shift-Delete" in res)
+    assert (os.path.exists(apath))
+
+
+def test_manifest(setupdir):
+    from logic.transactions.manifest import Manifest
+    apath = os.path.join(tmpdir, "A")
+    os.symlink("C/x.txt", os.path.join(apath, "link"))
+    dpath = os.path.join(tmpdir, "D")
+    manifest = Manifest.build([(apath, dpath)])
+    assert ([h[1] for h in manifest.dirs][0] == dpath)
+    assert (len(manifest.dirs) == 3)
+    assert (sorted(os.path.basename(h[0]) for h in manifest.files) == ["x.txt", "y.txt"])
+    assert (manifest.links == [("C/x.txt", os.path.join(dpath, "link"))])
+    assert (manifest.total_bytes == 3)
+    assert (manifest.total_files() == 3)
+    assert (manifest.unreadable == [])
+
+
+@pytest.mark.asyncio
+async def test_copy_strategies(setupdir, monkeypatch):
+    from logic.transactions import copyengine
+    apath = os.path.join(tmpdir, "A")
+    os.mkdir(os.path.join(tmpdir, "D"))
+    c1 = CopyTransaction(Selection([apath]), os.path.join(tmpdir, "D"))
+    assert (await c1.execute() is None)
+    used = c1.get_strategies()
+    assert (sum(used.values()) == 2)
+    # Clones where the filesystem has them, copy_file_range elsewhere
+    assert (set(used) <= {"clone", "copy_file_range", "sendfile", "buffered"})
+
+    # Without clone and copy_file_range support the buffered copy is used
+    def unsupported(src_fd, dst_fd, progress):
+        return False
+    monkeypatch.setattr(copyengine, "strategies",
+                        [unsupported, copyengine._buffered])
+    os.mkdir(os.path.join(tmpdir, "E"))
+    c2 = CopyTransaction(Selection([apath]), os.path.join(tmpdir, "E"))
+    assert (await c2.execute() is None)
+    assert (c2.get_strategies() == {"buffered": 2})
+    with open(os.path.join(tmpdir, "E", "A", "C", "x.txt")) as f:
+        assert (f.read() == "1")
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import pytest
+from logic.workspace import Workspace
+from logic.workspacemanager import WorkspaceManager
+
+
+@pytest.fixture
+def watched():
+    global tmpdir
+    tmpdir = tempfile.mkdtemp(suffix="td")
+    os.mkdir(os.path.join(tmpdir, "A"))
+    os.mkdir(os.path.join(tmpdir, "A", "C"))
+    with open(os.path.join(tmpdir, "A", "C", "x.txt"), "w"):
+        pass
+    with open(os.path.join(tmpdir, "b.txt"), "w"):
+        pass
+    if not WorkspaceManager.enable_watcher():
+        pytest.skip("inotify is not available")
+    global wspace
+    wspace = Workspace(tmpdir)
+    yield
+    WorkspaceManager.disable_watcher()
+
+
+def names():
+    WorkspaceManager.dispatch_events()
+    return [h.get_name() for h in wspace.get_contents()]
+
+
+def test_live(watched):
+    assert wspace.is_live()
+    assert names() == ["A", "b.txt"]
+
+
+def test_create_and_delete(watched):
+    with open(os.path.join(tmpdir, "a.txt"), "w"):
+        pass
+    assert names() == ["A", "a.txt", "b.txt"]
+    os.remove(os.path.join(tmpdir, "b.txt"))
+    assert names() == ["A", "a.txt"]
+
+
+def test_rename(watched):
+    os.rename(os.path.join(tmpdir, "b.txt"), os.path.join(tmpdir, "0.txt"))
+    assert names() == ["0.txt", "A"]
+
+
+def test_sorted_by_size(watched):
+    wspace.set_sort("size", "desc")
+    with open(os.path.join(tmpdir, "b.txt"), "w") as f:
+        f.write("1" * 100000)
+    assert names()[0] == "b.txt"
+
+
+def test_tree(watched):
+    wspace.set_tree(True)
+    assert names() == ["A", "C", "x.txt", "b.txt"]
+    os.mkdir(os.path.join(tmpdir, "A", "B"))
+    assert names() == ["A", "B", "C", "x.txt", "b.txt"]
+    with open(os.path.join(tmpdir, "A", "B", "y.txt"), "w"):
+        pass
+    assert names() == ["A", "B", "y.txt", "C", "x.txt", "b.txt"]
+    shutil.move(os.path.join(tmpdir, "A", "C"), os.path.join(tmpdir, "D"))
+    assert names() == ["A", "B", "y.txt", "D", "x.txt", "b.txt"]
+    shutil.rmtree(os.path.join(tmpdir, "A"))
+    assert names() == ["D", "x.txt", "b.txt"]
+
+
+def test_batch_keeps_order(watched):
+    wspace.set_sort("size", "desc")
+    a = [h for h in wspace.get_contents() if h.get_name() == "A"][0]
+    for i in [3, 1, 4, 1, 5, 9, 2, 6]:
+        with open(os.path.join(tmpdir, f"s{i}{len(os.listdir(tmpdir))}"), "w") as f:
+            f.write("1" * i * 1000)
+    WorkspaceManager.dispatch_events()
+    sizes = [h.getSize() for h in wspace.get_contents() if not h.isDir()]
+    assert sizes == sorted(sizes, reverse=True)
+    # Patched, not rebuilt: the entries are still the same objects
+    assert a in wspace.get_contents()
+
+
+def test_large_batch_rebuilds(watched, monkeypatch):
+    monkeypatch.setattr(Workspace, "min_rebuild_batch", 2)
+    a = [h for h in wspace.get_contents() if h.get_name() == "A"][0]
+    for i in range(5):
+        with open(os.path.join(tmpdir, f"c{i}"), "w"):
+            pass
+    assert names() == ["A", "b.txt", "c0", "c1", "c2", "c3", "c4"]
+    assert wspace.get_contents()[0] is not a
+
+
+def test_tree_overflow_goes_flat(watched, monkeypatch):
+    monkeypatch.setattr(Workspace, "max_entries", 10)
+    assert wspace.set_tree(True) is None
+    # A whole tree moved in at once is one event, and too large to show
+    big = os.path.join(tempfile.mkdtemp(suffix="td"), "big")
+    os.mkdir(big)
+    for i in range(20):
+        with open(os.path.join(big, f"f{i}"), "w"):
+            pass
+    shutil.move(big, os.path.join(tmpdir, "big"))
+    assert names() == ["A", "b.txt", "big"]
+    assert not wspace.get_tree()
+    assert wspace.take_error() is not None
+    assert wspace.take_error() is None
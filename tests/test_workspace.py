@@ -1,3 +1,4 @@
+import asyncio
 import tempfile
 import pytest
 import os
@@ -31,6 +32,14 @@ def test_sort(setupdir):
     arr=wspace.get_contents()
     assert([h.get_name() for h in arr]==["A","C","x.txt","B"])
 
+def test_sort_no_rescan(setupdir):
+    wspace.set_tree(True)
+    before=set(wspace.get_contents())
+    wspace.set_sort("name","asc")
+    arr=wspace.get_contents()
+    assert(set(arr)==before)
+    assert([h.get_name() for h in arr]==["A","B","C","x.txt"])
+
 def getfile(name):
     return [h for h in wspace.get_contents() if h.get_name()==name][0]
 
@@ -54,6 +63,18 @@ def test_selection(setupdir):
     for h in wspace.get_contents():
         assert(h.getSelected()==(True if h==getfile("A") else "unavailable"))
 
+
+def test_children_and_selection(setupdir):
+    wspace.set_tree(True)
+    Afile=getfile("A")
+    Cfile=getfile("C")
+    assert(set(wspace.get_children(Afile))=={getfile("B"),Cfile,getfile("x.txt")})
+    assert(wspace.get_children(Cfile)==[getfile("x.txt")])
+    assert(wspace.get_children(getfile("B"))==[])
+    wspace.set_selected(Cfile,True)
+    wspace.set_selected(getfile("B"),True)
+    assert(sorted(wspace.get_selection().get_list())==sorted([Cfile.getPath(),getfile("B").getPath()]))
+
     
 def test_step(setupdir):
     Afile=getfile("A")
@@ -63,4 +84,108 @@ def test_step(setupdir):
     assert([h.get_name() for h in wspace.get_contents()]==["x.txt"])
     wspace.step_up()
     wspace.step_up()
-    assert(cpath==wspace.get_path())
\ No newline at end of file
+    assert(cpath==wspace.get_path())
+
+def test_too_many_files(setupdir, monkeypatch):
+    monkeypatch.setattr(Workspace, "max_entries", 3)
+    assert(wspace.set_tree(True)=="Too many files")
+    assert(not wspace.get_tree())
+    monkeypatch.setattr(Workspace, "max_entries", 4)
+    assert(wspace.set_tree(True) is None)
+    assert(len(wspace.get_contents())==4)
+
+
+@pytest.mark.asyncio
+async def test_background_step(setupdir):
+    wspace.step_in(os.path.join(tmpdir,"A"))
+    assert(wspace.is_loading())
+    wspace.step_in(os.path.join(tmpdir,"A","C"))
+    while wspace.is_loading():
+        await asyncio.sleep(0.01)
+    assert([h.get_name() for h in wspace.get_contents()]==["x.txt"])
+
+
+@pytest.mark.asyncio
+async def test_background_read_error(setupdir, monkeypatch):
+    # The directory turns unreadable after the first chunk
+    from logic import workspace
+    read_chunk=workspace.read_chunk
+    calls=[]
+    def failing(iterator, size):
+        calls.append(size)
+        if len(calls)>1:
+            raise PermissionError(13,"Permission denied")
+        return read_chunk(iterator, 1)
+    monkeypatch.setattr(workspace,"read_chunk",failing)
+    updates=[]
+    wspace.subscribe(lambda *args, **kwargs: updates.append(wspace.take_error()))
+    wspace.step_in(os.path.join(tmpdir,"A"))
+    while wspace.is_loading():
+        await asyncio.sleep(0.01)
+    assert(len(wspace.get_contents())==1)
+    assert(updates[-1].startswith("Cannot read "+os.path.join(tmpdir,"A")))
+
+
+def test_bulk_selection(setupdir):
+    wspace.set_tree(True)
+    wspace.select_all()
+    assert([h.getSelected() for h in wspace.get_contents()]==[True,"unavailable","unavailable","unavailable"])
+    assert(wspace.get_selection().get_list()==[getfile("A").getPath()])
+
+    wspace.clear_selection()
+    assert(all(h.getSelected()==False for h in wspace.get_contents()))
+    assert(wspace.get_selection().empty())
+
+    wspace.set_selected(getfile("C"),True)
+    wspace.invert_selection()
+    # A holds C, so the inversion goes below it and takes everything else
+    assert(wspace.get_selection().get_list()==[getfile("B").getPath()])
+    assert(getfile("A").getSelected()==False)
+    assert(getfile("C").getSelected()==False)
+    assert(getfile("x.txt").getSelected()==False)
+    wspace.invert_selection()
+    assert(wspace.get_selection().get_list()==[getfile("C").getPath()])
+
+    wspace.clear_selection()
+    wspace.set_selected(getfile("B"),True)
+    wspace.select_where(lambda h: h.get_name()=="x.txt")
+    assert(wspace.get_selection().get_list()==[getfile("B").getPath(),getfile("x.txt").getPath()])
+    wspace.select_where(lambda h: h.get_name()=="C")
+    assert(wspace.get_selection().get_list()==[getfile("B").getPath(),getfile("C").getPath()])
+    assert(getfile("x.txt").getSelected()=="unavailable")
+
+
+def test_bulk_selection_notifies_once(setupdir):
+    for i in range(50):
+        with open(os.path.join(tmpdir,f"f{i}"),"w"):
+            pass
+    wspace.rebuild()
+    file_updates=[]
+    for h in wspace.get_contents():
+        h.subscribe(lambda *args: file_updates.append(1))
+    updates=[]
+    wspace.subscribe(lambda *args, **kwargs: updates.append(kwargs))
+    versions={h: h.get_version() for h in wspace.get_contents()}
+    wspace.select_all()
+    assert(updates==[{"refresh_rows": True}])
+    assert(file_updates==[])
+    assert(all(h.get_version()>versions[h] for h in wspace.get_contents()))
+    assert(len(wspace.get_selection().get_list())==51)
+
+
+@pytest.mark.asyncio
+async def test_sizes_of_vanished_directory(setupdir):
+    import shutil
+    ws=Workspace(tmpdir)
+    shutil.rmtree(os.path.join(tmpdir,"A"))
+    await ws._compute_sizes(ws._generation)
+
+
+def test_rebuild_too_many_files(setupdir, monkeypatch):
+    monkeypatch.setattr(Workspace, "max_entries", 4)
+    assert(wspace.set_tree(True) is None)
+    with open(os.path.join(tmpdir,"A","B","y.txt"),"w"):
+        pass
+    assert(wspace.rebuild() is not None)
+    assert(not wspace.get_tree())
+    assert([h.get_name() for h in wspace.get_contents()]==["A"])